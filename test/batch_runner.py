@@ -0,0 +1,183 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterator, List, Optional
+from model import build_model, calculate_regression_metrics
+from outliers import LOG10_POSITIVE, iterative_outlier_removal, normalize_data, split_data
+from project_table import ProjectTable
+
+# environment variables limiting the threads of the BLAS/OpenMP backends
+THREAD_VARIABLES = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+SUMMARY_COLUMNS = (
+    "name",
+    "path",
+    "rows",
+    "rows_after_outliers",
+    "n_train",
+    "n_test",
+    "b0",
+    "b1",
+    "b2",
+    "r_squared",
+    "mmre",
+    "pred",
+    "test_r_squared",
+    "test_mmre",
+    "test_pred",
+    "seconds",
+    "error",
+)
+
+
+def read_manifest(path: str) -> List[Dict]:
+    """
+    Read the datasets to process.
+
+    A .json manifest is a list of {"path": ..., "name": ..., "relative": ...,
+    "train_ratio": ..., "seed": ...} objects where only "path" is required
+    ("relative" defaults to true, metrics divided by NOC as in outliers.py);
+    any other file lists one CSV path per line (blank lines and lines
+    starting with # are skipped). Relative paths are resolved against the
+    manifest's directory.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path) as file:
+        if path.endswith(".json"):
+            entries = json.load(file)
+        else:
+            entries = [
+                {"path": line.strip()}
+                for line in file
+                if line.strip() and not line.lstrip().startswith("#")
+            ]
+    for entry in entries:
+        if "path" not in entry:
+            raise ValueError(f"Manifest entry {entry} has no path")
+        entry["path"] = os.path.join(base, entry["path"])
+        entry.setdefault("name", os.path.splitext(os.path.basename(entry["path"]))[0])
+    return entries
+
+
+def run_dataset(entry: Dict, log_dir: Optional[str] = None) -> Dict:
+    """Normalize, remove outliers, split, fit and test one dataset."""
+    result = {"name": entry["name"], "path": entry["path"], "error": None}
+    start = time.perf_counter()
+    log_path = os.path.join(log_dir, f"{entry['name']}.log") if log_dir else os.devnull
+    try:
+        with open(log_path, "w") as log, contextlib.redirect_stdout(log):
+            projects = normalize_data(
+                ProjectTable.from_csv(entry["path"], relative=entry.get("relative", True))
+            )
+            final_projects = iterative_outlier_removal(projects)
+            train, test = split_data(
+                final_projects,
+                train_ratio=entry.get("train_ratio", 0.6),
+                rng=np.random.default_rng(entry.get("seed")),
+            )
+            # fit and score on the z-columns the outlier screening used
+            b0, b1, b2, zy_hat = build_model(train.zx1, train.zx2, train.zy)
+            r_squared, mmre, pred = calculate_regression_metrics(train.zy, zy_hat, LOG10_POSITIVE)
+            test_r_squared, test_mmre, test_pred = calculate_regression_metrics(
+                test.zy, b0 + b1 * test.zx1 + b2 * test.zx2, LOG10_POSITIVE
+            )
+        result.update(
+            rows=len(projects),
+            rows_after_outliers=len(final_projects),
+            n_train=len(train),
+            n_test=len(test),
+            b0=b0,
+            b1=b1,
+            b2=b2,
+            r_squared=r_squared,
+            mmre=mmre,
+            pred=pred,
+            test_r_squared=test_r_squared,
+            test_mmre=test_mmre,
+            test_pred=test_pred,
+        )
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        if log_dir:
+            with open(log_path, "a") as log:
+                traceback.print_exc(file=log)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+@contextlib.contextmanager
+def thread_limits(threads: int) -> Iterator[None]:
+    """Set the BLAS/OpenMP thread variables inherited by new worker processes."""
+    previous = {name: os.environ.get(name) for name in THREAD_VARIABLES}
+    os.environ.update({name: str(threads) for name in THREAD_VARIABLES})
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def run_batch(
+    entries: List[Dict],
+    workers: Optional[int] = None,
+    blas_threads: Optional[int] = None,
+    log_dir: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Run every dataset in a process pool and return one summary row per dataset.
+
+    Workers are spawned fresh, so the thread limits apply to their BLAS
+    libraries; by default the cores are divided evenly between workers. Each
+    worker imports pandas and scipy once and then processes many datasets.
+    """
+    workers = workers or os.cpu_count() or 1
+    blas_threads = blas_threads or max((os.cpu_count() or 1) // workers, 1)
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+
+    with thread_limits(blas_threads):
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = [executor.submit(run_dataset, entry, log_dir) for entry in entries]
+            results = []
+            for future in futures:
+                result = future.result()
+                status = result["error"] or f"R^2 = {result['r_squared']:.4f}"
+                print(f"{result['name']}: {status} ({result['seconds']:.2f}s)")
+                results.append(result)
+    counts = ("rows", "rows_after_outliers", "n_train", "n_test")
+    return pd.DataFrame(results, columns=SUMMARY_COLUMNS).astype({name: "Int64" for name in counts})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the outlier and model pipeline over many datasets.")
+    parser.add_argument("manifest", help="JSON list of datasets or a text file of CSV paths")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--blas-threads", type=int, help="BLAS threads per worker (default: cores / workers)")
+    parser.add_argument("--output", default="batch_summary.csv", help="summary CSV file")
+    parser.add_argument("--log-dir", help="write each dataset's pipeline output to <log-dir>/<name>.log")
+    args = parser.parse_args()
+
+    summary = run_batch(read_manifest(args.manifest), args.workers, args.blas_threads, args.log_dir)
+    summary.to_csv(args.output, index=False)
+    failed = summary["error"].notna().sum()
+    print(f"\n{len(summary) - failed} of {len(summary)} datasets processed; summary written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import argparse
+import time
+import tracemalloc
+from dataclasses import dataclass, replace
+import numpy as np
+from typing import Callable, List
+from project_table import Project, ProjectTable
+
+
+@dataclass(frozen=True)
+class DictProject:
+    """The previous dict-backed Project, kept for comparison."""
+
+    url: str
+    x1: float
+    x2: float
+    y: float
+    zx1: float = 0.0
+    zx2: float = 0.0
+    zy: float = 0.0
+    ts: float = 0.0
+
+
+def synthetic_table(n: int, seed: int = 0) -> ProjectTable:
+    rng = np.random.default_rng(seed)
+    return ProjectTable(
+        url=np.array([f"https://github.com/owner/project-{i}" for i in range(n)], dtype=object),
+        x1=rng.lognormal(0, 1, n),
+        x2=rng.lognormal(2, 1, n),
+        y=rng.lognormal(2, 1, n),
+    )
+
+
+def measure(build: Callable[[], object]) -> tuple:
+    """Return (result, peak bytes allocated, seconds) of build()."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak, seconds
+
+
+def as_objects(table: ProjectTable, cls) -> List:
+    # URL strings are shared with the table, so only the records are counted
+    return [
+        cls(url, float(x1), float(x2), float(y))
+        for url, x1, x2, y in zip(table.url, table.x1, table.x2, table.y)
+    ]
+
+
+def normalize_objects(projects: List) -> List:
+    """The previous update path: rebuild every record with its z-values."""
+    return [
+        replace(p, zx1=np.log10(p.x1), zx2=np.log10(p.x2), zy=np.log10(p.y))
+        for p in projects
+    ]
+
+
+def normalize_columns(table: ProjectTable) -> ProjectTable:
+    return table.with_columns(zx1=np.log10(table.x1), zx2=np.log10(table.x2), zy=np.log10(table.y))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory per project record.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+    n = args.rows
+
+    table = synthetic_table(n)
+    rows = [
+        ("dict dataclass", lambda: as_objects(table, DictProject)),
+        ("slotted Project", lambda: as_objects(table, Project)),
+        ("ProjectTable columns", lambda: table.take(np.arange(n))),
+        ("structured array", lambda: table.to_records()),
+    ]
+    print(f"{'representation':<24}{'bytes/record':>14}{'build s':>10}")
+    results = {}
+    for name, build in rows:
+        results[name], peak, seconds = measure(build)
+        print(f"{name:<24}{peak / n:>14.1f}{seconds:>10.3f}")
+
+    print(f"\n{'normalize update':<24}{'bytes/record':>14}{'seconds':>10}")
+    for name, update in (
+        ("dict dataclass", lambda: normalize_objects(results["dict dataclass"])),
+        ("slotted Project", lambda: normalize_objects(results["slotted Project"])),
+        ("ProjectTable columns", lambda: normalize_columns(table)),
+    ):
+        _, peak, seconds = measure(update)
+        print(f"{name:<24}{peak / n:>14.1f}{seconds:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
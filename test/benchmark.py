@@ -0,0 +1,221 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from model import build_model, calculate_intervals
+from multicol import analyze_metrics
+from outliers import (
+    determine_outliers_mahalanobis,
+    iterative_outlier_removal,
+    mardia_test,
+    mardia_tests,
+    normalize_data,
+    projects_to_array,
+)
+from project_table import ProjectTable
+
+results_path = os.path.join(os.path.dirname(__file__), "data", "benchmarks.jsonl")
+DEFAULT_SIZES = (100, 1_000, 10_000, 100_000)
+# a stage is reported as a regression when it is this much slower than before
+REGRESSION_THRESHOLD = 1.2
+# timings below this are too noisy to compare
+MIN_SECONDS = 0.001
+DATASET_COLUMNS = ("URL", "SLOC", "NOC", "NOM", "DIT", "RFC", "CBO", "WMC")
+
+
+def synthetic_frame(n: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generate n projects shaped like assets/dataset.csv.
+
+    Size metrics are log-normal around the medians of the real dataset and
+    RFC follows a log-linear model of CBO and WMC, with 1% gross outliers.
+    """
+    rng = np.random.default_rng(seed)
+    log_sloc = rng.normal(np.log(3000), 0.8, n)
+    noc = np.maximum(np.round(np.exp(log_sloc - np.log(35) + rng.normal(0, 0.3, n))), 1)
+    nom = np.maximum(np.round(noc * np.exp(rng.normal(1.4, 0.3, n))), 1)
+    dit = np.maximum(np.round(noc * np.exp(rng.normal(-0.1, 0.2, n))), 1)
+    cbo = np.maximum(np.round(np.exp(np.log(noc) - 1.6 + rng.normal(0, 0.5, n))), 1)
+    wmc = np.maximum(np.round(nom * np.exp(rng.normal(0.9, 0.3, n))), 1)
+    log_rfc = -0.04 + 0.03 * np.log10(cbo) + 0.95 * np.log10(wmc) + rng.normal(0, 0.06, n)
+    outliers = rng.random(n) < 0.01
+    log_rfc[outliers] += rng.normal(0, 1, outliers.sum())
+    rfc = np.maximum(np.round(10**log_rfc), 1)
+    return pd.DataFrame(
+        {
+            "URL": [f"https://github.com/synthetic/project-{i}" for i in range(n)],
+            "SLOC": np.round(np.exp(log_sloc)),
+            "NOC": noc,
+            "NOM": nom,
+            "DIT": dit,
+            "RFC": rfc,
+            "CBO": cbo,
+            "WMC": wmc,
+        },
+        columns=DATASET_COLUMNS,
+    )
+
+
+def stages(projects: ProjectTable, csv_path: str) -> Dict[str, Callable[[], object]]:
+    """Return the benchmarked calls on a normalized table and its CSV file."""
+    Z = projects_to_array(projects)
+    zx1, zx2, zy = projects.zx1, projects.zx2, projects.zy
+    _, _, _, zy_hat = build_model(zx1, zx2, zy)
+    return {
+        "build_model": lambda: build_model(zx1, zx2, zy),
+        "calculate_intervals": lambda: calculate_intervals(Z[:, :2], zy, zy_hat),
+        "determine_outliers_mahalanobis": lambda: determine_outliers_mahalanobis(projects),
+        "mardia_test": lambda: mardia_test(Z),
+        "mardia_tests": lambda: mardia_tests(Z),
+        "iterative_outlier_removal": lambda: iterative_outlier_removal(projects),
+        "analyze_metrics": lambda: analyze_metrics(csv_path),
+    }
+
+
+def run_stage(call: Callable[[], object], repeat: int) -> Tuple[float, int]:
+    """
+    Return the best wall time over `repeat` calls and the peak traced memory
+    of one call. A warm-up call first fills caches such as the critical value
+    table.
+    """
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        call()
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            call()
+            times.append(time.perf_counter() - start)
+        # tracemalloc slows allocation-heavy code, so memory is measured separately
+        tracemalloc.start()
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return min(times), peak
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    names: Optional[Sequence[str]] = None,
+    repeat: int = 3,
+    seed: int = 0,
+) -> List[dict]:
+    """Benchmark every stage at every size and return one record per (stage, rows)."""
+    run = {
+        "run": uuid.uuid4().hex[:12],
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+    }
+    records = []
+    with tempfile.TemporaryDirectory() as directory:
+        for n in sizes:
+            frame = synthetic_frame(n, seed)
+            csv_path = os.path.join(directory, f"{n}.csv")
+            frame.to_csv(csv_path, index=False)
+            projects = normalize_data(ProjectTable._from_frame(frame[["URL", "CBO", "WMC", "RFC", "NOC"]]))
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                calls = stages(projects, csv_path)
+            for name, call in calls.items():
+                if names and name not in names:
+                    continue
+                seconds, peak = run_stage(call, repeat)
+                record = {**run, "stage": name, "rows": n, "seconds": seconds, "peak_bytes": peak}
+                records.append(record)
+                print(f"{name:<32}{n:>10}{seconds:>12.4f}s{peak / 2**20:>10.1f} MiB")
+    return records
+
+
+def load_results(path: str) -> List[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def save_results(records: List[dict], path: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a") as file:
+        for record in records:
+            file.write(json.dumps(record) + "\n")
+
+
+def compare(
+    records: List[dict], previous: List[dict], threshold: float = REGRESSION_THRESHOLD
+) -> List[dict]:
+    """
+    Compare records with the latest earlier result of the same stage and size.
+
+    Returns the records that are more than `threshold` times slower.
+    """
+    baseline = {}
+    for record in previous:
+        baseline[(record["stage"], record["rows"])] = record
+    regressions = []
+    print(f"\n{'stage':<32}{'rows':>10}{'before':>12}{'after':>12}{'ratio':>8}")
+    for record in records:
+        before = baseline.get((record["stage"], record["rows"]))
+        if before is None:
+            continue
+        ratio = record["seconds"] / before["seconds"]
+        slow = ratio > threshold and record["seconds"] > MIN_SECONDS
+        flag = " REGRESSION" if slow else ""
+        print(
+            f"{record['stage']:<32}{record['rows']:>10}{before['seconds']:>12.4f}"
+            f"{record['seconds']:>12.4f}{ratio:>8.2f}{flag}"
+        )
+        if flag:
+            regressions.append(record)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the regression, outlier and normality stages.")
+    parser.add_argument(
+        "--sizes",
+        default=",".join(map(str, DEFAULT_SIZES)),
+        help="comma separated row counts, up to 10000000",
+    )
+    parser.add_argument("--stages", help="comma separated stage names (default: all)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=results_path, help="JSON lines file the results are appended to")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    names = args.stages.split(",") if args.stages else None
+    previous = load_results(args.output)
+    records = run_benchmarks(sizes, names, args.repeat, args.seed)
+    save_results(records, args.output)
+
+    if previous and compare(records, previous, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+from typing import Optional
+from model import calculate_regression_metrics, retrieve_data
+from ols import OLSSolver, batched_lstsq
+from quantiles import critical_value
+
+STATISTICS = ("b0", "b1", "b2", "r_squared", "mmre", "pred")
+
+
+@dataclass(frozen=True)
+class BootstrapResult:
+    estimate: np.ndarray
+    replicates: np.ndarray
+    jackknife: np.ndarray
+
+    def percentile_intervals(self, alpha: float = 0.05) -> np.ndarray:
+        """Return (n_statistics, 2) percentile intervals."""
+        return np.nanquantile(self.replicates, [alpha / 2, 1 - alpha / 2], axis=0).T
+
+    def bca_intervals(self, alpha: float = 0.05) -> np.ndarray:
+        """Return (n_statistics, 2) bias-corrected and accelerated intervals."""
+        replicates = self.replicates
+        proportion = np.mean(replicates < self.estimate, axis=0)
+        z0 = norm.ppf(np.clip(proportion, 1e-12, 1 - 1e-12))
+
+        deviations = np.nanmean(self.jackknife, axis=0) - self.jackknife
+        with np.errstate(divide="ignore", invalid="ignore"):
+            acceleration = np.nansum(deviations**3, axis=0) / (
+                6 * np.nansum(deviations**2, axis=0) ** 1.5
+            )
+        acceleration = np.nan_to_num(acceleration)
+
+        z = np.array(
+            [critical_value("norm", alpha / 2), critical_value("norm", 1 - alpha / 2)]
+        )[:, np.newaxis]
+        adjusted = norm.cdf(z0 + (z0 + z) / (1 - acceleration * (z0 + z)))
+        return np.array(
+            [
+                np.nanquantile(replicates[:, j], adjusted[:, j])
+                for j in range(replicates.shape[1])
+            ]
+        )
+
+    def summary(self, alpha: float = 0.05) -> pd.DataFrame:
+        percentile = self.percentile_intervals(alpha)
+        bca = self.bca_intervals(alpha)
+        return pd.DataFrame(
+            {
+                "estimate": self.estimate,
+                "std_error": np.nanstd(self.replicates, axis=0, ddof=1),
+                "percentile_lower": percentile[:, 0],
+                "percentile_upper": percentile[:, 1],
+                "bca_lower": bca[:, 0],
+                "bca_upper": bca[:, 1],
+            },
+            index=list(STATISTICS),
+        )
+
+
+def resample_statistics(Z: np.ndarray, index: np.ndarray) -> np.ndarray:
+    """
+    Fit the model on each row of the (B, m) index matrix at once.
+
+    Returns a (B, 6) array of b0, b1, b2, R^2, MMRE and PRED, where the metrics
+    are those of each resample's own fit.
+    """
+    X = np.column_stack((np.ones(Z.shape[0]), Z[:, :-1]))[index]
+    y = Z[:, -1][index]
+    coefficients = batched_lstsq(X, y[:, :, np.newaxis])[:, :, 0]
+    y_hat = np.einsum("bnk,bk->bn", X, coefficients)
+    metrics = calculate_regression_metrics(y, y_hat)
+    return np.column_stack((coefficients,) + metrics)
+
+
+def jackknife_statistics(
+    Z: np.ndarray, groups: int, rng: np.random.Generator, chunk_size: int
+) -> np.ndarray:
+    """
+    Return delete-a-group jackknife replicates of the statistics.
+
+    With `groups` >= n this is the ordinary delete-one jackknife; otherwise the
+    rows are shuffled into `groups` nearly equal groups, which keeps the cost
+    of estimating the BCa acceleration independent of n.
+    """
+    n = Z.shape[0]
+    folds = np.array_split(rng.permutation(n), min(groups, n))
+    statistics = np.empty((len(folds), len(STATISTICS)))
+    for start in range(0, len(folds), chunk_size):
+        members = range(start, min(start + chunk_size, len(folds)))
+        keep = {i: np.concatenate(folds[:i] + folds[i + 1:]) for i in members}
+        for size in {len(k) for k in keep.values()}:
+            same = [i for i in members if len(keep[i]) == size]
+            statistics[same] = resample_statistics(Z, np.stack([keep[i] for i in same]))
+    return statistics
+
+
+def bootstrap(
+    Z: np.ndarray,
+    n_resamples: int = 10000,
+    seed: Optional[int] = None,
+    chunk_size: int = 1000,
+    jackknife_groups: int = 1000,
+) -> BootstrapResult:
+    """
+    Bootstrap the coefficients and metrics of the regression of the last
+    column of Z on the others.
+
+    The resamples form one (n_resamples, n) index matrix that is drawn and
+    solved `chunk_size` rows at a time, so memory stays at
+    O(chunk_size * n * p) and the replicates do not depend on `chunk_size`.
+    The BCa acceleration comes from a jackknife over at most
+    `jackknife_groups` groups of rows.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer")
+    n = Z.shape[0]
+    rng = np.random.default_rng(seed)
+
+    solver = OLSSolver(Z[:, :-1])
+    coefficients = solver.solve(Z[:, -1])
+    estimate = np.concatenate(
+        (coefficients, calculate_regression_metrics(Z[:, -1], solver.predict(coefficients)))
+    )
+
+    replicates = np.empty((n_resamples, len(STATISTICS)))
+    for start in range(0, n_resamples, chunk_size):
+        stop = min(start + chunk_size, n_resamples)
+        index = rng.integers(0, n, size=(stop - start, n))
+        replicates[start:stop] = resample_statistics(Z, index)
+
+    return BootstrapResult(
+        estimate=estimate,
+        replicates=replicates,
+        jackknife=jackknife_statistics(Z, jackknife_groups, rng, chunk_size),
+    )
+
+
+def main():
+    projects = retrieve_data(normalized=True)
+    Z = np.column_stack((projects.zx1, projects.zx2, projects.zy))
+    result = bootstrap(Z, n_resamples=10000, seed=0)
+    print("Bootstrap 95% confidence intervals:")
+    print(result.summary().to_string(float_format="{:.4f}".format))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+import os
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Tuple
+from incremental import SufficientStatistics
+from outliers import (
+    alpha,
+    calculate_test_statistic,
+    data_path,
+    mardia_partial_moments,
+    mardia_result,
+    normalize_data,
+    projects_to_array,
+)
+from project_table import ProjectTable
+from quantiles import critical_value
+
+# rows read from the CSV at once
+chunk_rows = 100_000
+
+
+class ChunkedDataset:
+    """
+    A metrics CSV that is only ever read in chunks.
+
+    Per-row outlier flags live in a memory-mapped `.flags.npy` side file: 0 for
+    rows that are kept, otherwise the iteration in which the row was removed.
+    Removed outliers are also listed in an `.outliers.csv` side file.
+    """
+
+    def __init__(self, path: str, chunk_size: int = chunk_rows):
+        self.path = path
+        self.chunk_size = chunk_size
+        stem = os.path.splitext(path)[0]
+        self.flags_path = stem + ".flags.npy"
+        self.outliers_path = stem + ".outliers.csv"
+        self.flags: Optional[np.ndarray] = None
+
+    def chunks(self) -> Iterator[Tuple[int, ProjectTable]]:
+        """Yield (offset of the first row, normalized chunk) pairs."""
+        offset = 0
+        for table in ProjectTable.iter_csv(self.path, self.chunk_size, relative=True):
+            yield offset, normalize_data(table)
+            offset += len(table)
+
+    def active_chunks(self) -> Iterator[Tuple[np.ndarray, ProjectTable]]:
+        """Yield (row numbers, chunk) pairs restricted to rows not yet removed."""
+        for offset, table in self.chunks():
+            keep = self.flags[offset:offset + len(table)] == 0
+            yield offset + np.flatnonzero(keep), table.take(keep)
+
+    def create_flags(self, n: int) -> None:
+        self.flags = np.lib.format.open_memmap(
+            self.flags_path, mode="w+", dtype=np.int32, shape=(n,)
+        )
+        with open(self.outliers_path, "w") as file:
+            file.write("row,URL,iteration,test,statistic\n")
+
+    def record_outliers(
+        self, rows: np.ndarray, table: ProjectTable, iteration: int, test: str, statistic: np.ndarray
+    ) -> None:
+        self.flags[rows] = iteration
+        with open(self.outliers_path, "a") as file:
+            for row, url, value in zip(rows, table.url, statistic):
+                file.write(f"{row},{url},{iteration},{test},{value:.6f}\n")
+
+
+def raw_array(table: ProjectTable) -> np.ndarray:
+    return np.column_stack((table.x1, table.x2, table.y))
+
+
+def column_statistics(
+    dataset: ChunkedDataset,
+) -> Tuple[SufficientStatistics, SufficientStatistics]:
+    """First pass: sufficient statistics of the raw and the normalized metrics."""
+    raw, normalized = SufficientStatistics(3), SufficientStatistics(3)
+    for _, table in dataset.chunks():
+        raw.add(raw_array(table))
+        normalized.add(projects_to_array(table))
+    return raw, normalized
+
+
+def chunked_mardia(
+    dataset: ChunkedDataset, statistics: Dict[str, SufficientStatistics]
+) -> Dict[str, dict]:
+    """
+    Second pass: Mardia's tests for each named column set.
+
+    The whitened third-moment tensors and fourth moments are summed over the
+    chunks, which gives the same coefficients as mardia_tests on the full data.
+    """
+    arrays = {"raw": raw_array, "normalized": projects_to_array}
+    whitening = {}
+    for name, stats in statistics.items():
+        n = stats.n
+        S = stats.covariance() * (n - 1) / n
+        try:
+            whitening[name] = (stats.mean(), np.linalg.cholesky(np.linalg.inv(S)))
+        except np.linalg.LinAlgError:
+            raise ValueError("Covariance matrix is singular and cannot be inverted.")
+
+    third_moments = {name: np.zeros((3, 3, 3)) for name in statistics}
+    traces = {name: 0.0 for name in statistics}
+    for _, table in dataset.chunks():
+        for name, (mean, L) in whitening.items():
+            third_moment, trace_squared = mardia_partial_moments(
+                arrays[name](table) - mean, L
+            )
+            third_moments[name] += third_moment
+            traces[name] += trace_squared
+
+    results = {}
+    for name, stats in statistics.items():
+        beta_1_k = np.sum(third_moments[name] ** 2) / stats.n**2
+        beta_2_k = traces[name] / stats.n
+        results[name] = mardia_result(stats.n, 3, beta_1_k, beta_2_k)
+    return results
+
+
+def predicted_values(
+    Z: np.ndarray, coefficients: Tuple[float, ...]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (Y_hat, X) as computed in outliers.find_outliers."""
+    X = np.column_stack((np.ones(Z.shape[0]), Z[:, :-1]))
+    Y_hat_initial = X @ np.asarray(coefficients)
+    epsilon = Z[:, -1] - Y_hat_initial
+    return Y_hat_initial + epsilon, X
+
+
+def chunked_outlier_removal(
+    dataset: ChunkedDataset, stats: SufficientStatistics
+) -> SufficientStatistics:
+    """
+    Remove Mahalanobis and prediction interval outliers until none are left.
+
+    Each iteration makes two passes over the file: one for the residual mean
+    square and one that flags the outliers. The statistics are then
+    downdated by the flagged rows instead of being recomputed.
+    """
+    iteration = 1
+    while True:
+        print(f"\nStarting iteration {iteration}")
+        n = stats.n
+        mean, cov_inv = stats.mean(), stats.cov_inv()
+        coefficients = stats.coefficients()
+        p = len(coefficients)
+        k = len(mean)
+        fisher_f = critical_value("f", 1 - alpha, k, n - k)
+        t_value = critical_value("t", 1 - alpha / 2, n - p)
+        print(f"Fisher F value for {n} projects = {fisher_f:.4f}")
+
+        residual_squares = 0.0
+        for _, table in dataset.active_chunks():
+            Z = projects_to_array(table)
+            Y_hat, _ = predicted_values(Z, coefficients)
+            residual_squares += np.sum((Z[:, -1] - Y_hat) ** 2)
+        mse = residual_squares / (n - p)
+
+        removed: List[np.ndarray] = []
+        for rows, table in dataset.active_chunks():
+            Z = projects_to_array(table)
+            centered = Z - mean
+            distances = np.sqrt(np.sum(centered @ cov_inv * centered, axis=1))
+            test_statistic = calculate_test_statistic(n, distances, k)
+            mahalanobis = test_statistic > fisher_f
+
+            Y_hat, X = predicted_values(Z, coefficients)
+            margin = t_value * np.sqrt(mse * (1 + stats.leverage(X)))
+            intervals = (Z[:, -1] < Y_hat - margin) | (Z[:, -1] > Y_hat + margin)
+
+            dataset.record_outliers(
+                rows[mahalanobis], table.take(mahalanobis), iteration,
+                "mahalanobis", test_statistic[mahalanobis],
+            )
+            intervals &= ~mahalanobis
+            dataset.record_outliers(
+                rows[intervals], table.take(intervals), iteration,
+                "prediction_interval", Y_hat[intervals],
+            )
+            removed.append(Z[mahalanobis | intervals])
+
+        removed_rows = np.concatenate(removed) if removed else np.empty((0, 3))
+        print(f"Iteration {iteration}: removed {len(removed_rows)} of {n} projects")
+        if len(removed_rows) == 0:
+            print("No more outliers found. Stopping iterations.")
+            return stats
+        stats.remove_rows(removed_rows)
+        iteration += 1
+
+
+def chunked_split(
+    dataset: ChunkedDataset,
+    train_path: str,
+    test_path: str,
+    train_ratio: float = 0.6,
+    rng: Optional[np.random.Generator] = None,
+) -> Tuple[int, int]:
+    """
+    Split the remaining rows like outliers.split_data and stream them to CSV.
+
+    One pass finds the rows holding the min and max of each metric; a second
+    pass draws the rest of the training set with sequential hypergeometric
+    sampling, which picks exactly the required number of rows uniformly
+    without holding them in memory.
+    """
+    rng = np.random.default_rng(rng)
+    extremes = {}
+    for rows, table in dataset.active_chunks():
+        for column in ("x1", "x2", "y"):
+            values = getattr(table, column)
+            if len(values) == 0:
+                continue
+            for kind, pick in (("min", np.argmin), ("max", np.argmax)):
+                i = pick(values)
+                best = extremes.get((column, kind))
+                if (
+                    best is None
+                    or (kind == "min" and values[i] < best[1])
+                    or (kind == "max" and values[i] > best[1])
+                ):
+                    extremes[(column, kind)] = (rows[i], values[i])
+    extreme_rows = np.array(sorted({row for row, _ in extremes.values()}), dtype=np.intp)
+
+    n = int(np.sum(dataset.flags == 0))
+    remaining = n - len(extreme_rows)
+    needed = min(max(int(n * train_ratio) - len(extreme_rows), 0), remaining)
+
+    n_train = n_test = 0
+    for rows, table in dataset.active_chunks():
+        is_extreme = np.isin(rows, extreme_rows)
+        candidates = np.flatnonzero(~is_extreme)
+        k = 0
+        if needed > 0 and len(candidates) > 0:
+            k = rng.hypergeometric(needed, remaining - needed, len(candidates))
+        train = is_extreme.copy()
+        train[rng.choice(candidates, size=k, replace=False)] = True
+        needed -= k
+        remaining -= len(candidates)
+
+        for path, mask, written in ((train_path, train, n_train), (test_path, ~train, n_test)):
+            table.take(mask).to_frame().to_csv(
+                path, mode="a" if written else "w", header=not written, index=False
+            )
+        n_train += int(np.sum(train))
+        n_test += int(np.sum(~train))
+    return n_train, n_test
+
+
+def main(filename: str = "100.csv", chunk_size: int = chunk_rows):
+    dataset = ChunkedDataset(data_path(filename), chunk_size)
+    raw, normalized = column_statistics(dataset)
+    dataset.create_flags(normalized.n)
+
+    mardia = chunked_mardia(dataset, {"raw": raw, "normalized": normalized})
+    print("\nMardia's test for multivariate normality:")
+    print(mardia["raw"])
+    print(f"Initial number of data points: {normalized.n}")
+    print(mardia["normalized"])
+
+    final = chunked_outlier_removal(dataset, normalized)
+    print(f"\nFinal number of data points after outlier removal: {final.n}")
+
+    stem = os.path.splitext(dataset.path)[0]
+    n_train, n_test = chunked_split(dataset, stem + ".train.csv", stem + ".test.csv")
+    print(f"\nNumber of training data points: {n_train}")
+    print(f"Number of testing data points: {n_test}")
+    print(f"\nOutlier flags written to '{dataset.flags_path}' and '{dataset.outliers_path}'")
+
+
+if __name__ == "__main__":
+    main()
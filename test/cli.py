@@ -0,0 +1,229 @@
+"""
+Command line entry point for the metric analyses.
+
+    python cli.py outliers data/100.csv --output-dir data
+    python cli.py fit --train train_data.csv --save data/model
+    python cli.py test --model data/model --test test_data.csv
+    python cli.py intervals data/new_projects.csv --model data/model
+    python cli.py vif data/100.csv
+    python cli.py mardia data/100.csv
+
+Only numpy is imported at startup; each subcommand imports the modules it
+needs, and pandas or scipy only if it uses them. Scoring with a saved model
+(test, intervals) needs neither. Pass --import-time to report how long the
+imports took.
+"""
+import argparse
+import csv
+import importlib
+import os
+import sys
+import time
+import numpy as np
+from typing import Dict, List, Sequence
+
+data_dir = os.path.join(os.path.dirname(__file__), "data")
+
+
+class Imports:
+    """Import modules on first use, accumulating the time spent."""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    def __call__(self, name: str):
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        self.seconds += time.perf_counter() - start
+        return module
+
+
+imports = Imports()
+
+
+def resolve(path: str) -> str:
+    """Return `path` if it exists, else the file of that name in the data directory."""
+    if os.path.exists(path) or os.path.isabs(path):
+        return path
+    return os.path.join(data_dir, path)
+
+
+def read_columns(path: str, columns: Sequence[str]) -> Dict[str, np.ndarray]:
+    """Read numeric CSV columns with the csv module, without pandas."""
+    with open(path, newline="") as file:
+        reader = csv.DictReader(file)
+        missing = set(columns) - set(reader.fieldnames or ())
+        if missing:
+            raise ValueError(f"{path} has no column(s) {sorted(missing)}")
+        rows = [[row[c] for c in columns] for row in reader]
+    values = np.array(rows, dtype=float).reshape(-1, len(columns))
+    return {c: values[:, i] for i, c in enumerate(columns)}
+
+
+def load_or_fit(args):
+    """Load the model artifact, or fit one from the training file."""
+    prediction = imports("prediction")
+    if args.model and os.path.exists(os.path.join(args.model, prediction.MODEL_FILE)):
+        return prediction.load_model(args.model)
+    for name in ("pandas", "scipy.stats"):
+        imports(name)
+    model = imports("model")
+    projects = model.normalize_data(imports("project_table").ProjectTable.from_csv(resolve(args.train)))
+    # training files written by the outliers command hold metrics divided by NOC
+    return prediction.FittedModel.fit(
+        np.column_stack((projects.zx1, projects.zx2)), projects.zy, alpha=model.alpha, relative=True
+    )
+
+
+def command_outliers(args) -> None:
+    outliers = imports("outliers")
+    ProjectTable = imports("project_table").ProjectTable
+    projects = outliers.normalize_data(ProjectTable.from_csv(resolve(args.file), relative=args.relative))
+    print(f"Initial number of data points: {len(projects)}")
+    if args.robust:
+        final_projects = outliers.robust_outlier_removal(projects, seed=args.seed)
+    else:
+        final_projects = outliers.iterative_outlier_removal(projects)
+    print(f"\nFinal number of data points after outlier removal: {len(final_projects)}")
+
+    train, test = outliers.split_data(final_projects, rng=np.random.default_rng(args.seed))
+    print(f"\nNumber of training data points: {len(train)}")
+    print(f"Number of testing data points: {len(test)}")
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+        outliers.save_to_csv(train, os.path.join(args.output_dir, "train_data.csv"))
+        outliers.save_to_csv(test, os.path.join(args.output_dir, "test_data.csv"))
+        print(f"Saved train_data.csv and test_data.csv to {args.output_dir}")
+
+
+def command_fit(args) -> None:
+    model = imports("model")
+    prediction = imports("prediction")
+    projects = model.normalize_data(imports("project_table").ProjectTable.from_csv(resolve(args.train)))
+    b0, b1, b2, zy_hat = model.build_model(projects.zx1, projects.zx2, projects.zy)
+    r_squared, mmre, pred = model.calculate_regression_metrics(projects.zy, zy_hat)
+    model.print_results(b0, b1, b2, r_squared, mmre, pred)
+    if args.save:
+        fitted = prediction.FittedModel.fit(
+            np.column_stack((projects.zx1, projects.zx2)),
+            projects.zy,
+            alpha=model.alpha,
+            relative=True,
+            metrics={"r_squared": r_squared, "mmre": mmre, "pred": pred},
+        )
+        prediction.save_model(fitted, args.save)
+        print(f"Saved model to {args.save}")
+
+
+def command_test(args) -> None:
+    fitted = load_or_fit(args)
+    model = imports("model")
+    columns = read_columns(resolve(args.test), ("CBO", "WMC", "RFC"))
+    Z = np.column_stack(
+        [t.forward(columns[c]) for t, c in zip(fitted.predictor_transforms, ("CBO", "WMC"))]
+    )
+    zy_hat, _ = fitted.predict_transformed(Z)
+    r_squared, mmre, pred = model.calculate_regression_metrics(
+        fitted.transform.forward(columns["RFC"]), zy_hat, fitted.transform
+    )
+    print(f"Test Results: R^2 = {r_squared:.4f}, MMRE = {mmre:.4f}, PRED = {pred:.4f}")
+
+
+def command_intervals(args) -> None:
+    fitted = load_or_fit(args)
+    prediction = imports("prediction")
+    names = ("CBO", "WMC", "NOC") if fitted.relative else ("CBO", "WMC")
+    columns = read_columns(resolve(args.file), names)
+    result = fitted.predict_metrics(np.column_stack([columns[c] for c in names]))
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        output.write(",".join(prediction.PREDICTION_FIELDS) + "\n")
+        np.savetxt(output, result.as_array(), delimiter=",", fmt="%.6f")
+    finally:
+        if args.output:
+            output.close()
+
+
+def command_vif(args) -> None:
+    multicol = imports("multicol")
+    results = multicol.analyze_metrics(resolve(args.file), threshold=args.threshold)
+    print("\nVariance Inflation Factors:")
+    print(results["vif_results"])
+    print(f"\nHighly correlated pairs (|r| > {args.threshold}):")
+    for corr in results["high_correlations"]:
+        print(f"{corr['pair']}: {corr['correlation']:.3f}")
+
+
+def command_mardia(args) -> None:
+    outliers = imports("outliers")
+    ProjectTable = imports("project_table").ProjectTable
+    projects = outliers.normalize_data(ProjectTable.from_csv(resolve(args.file), relative=args.relative))
+    for name, value in outliers.mardia_tests(outliers.projects_to_array(projects)).items():
+        print(f"{name}: {value}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Software metric regression and outlier analysis.")
+    parser.add_argument("--import-time", action="store_true", help="report the time spent importing modules")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("outliers", help="remove outliers and split into train/test sets")
+    command.add_argument("file")
+    command.add_argument(
+        "--absolute", dest="relative", action="store_false", help="do not divide CBO, WMC and RFC by NOC"
+    )
+    command.add_argument("--robust", action="store_true", help="single pass with MCD distances")
+    command.add_argument("--seed", type=int)
+    command.add_argument("--output-dir", help="write train_data.csv and test_data.csv here")
+    command.set_defaults(handler=command_outliers, needs=("pandas", "scipy.stats"))
+
+    command = commands.add_parser("fit", help="fit the RFC model")
+    command.add_argument("--train", default="train_data.csv")
+    command.add_argument("--save", help="save the fitted model artifact to this directory")
+    command.set_defaults(handler=command_fit, needs=("pandas", "scipy.stats"))
+
+    for name, handler, help in (
+        ("test", command_test, "score the model on a test file"),
+        ("intervals", command_intervals, "prediction and confidence intervals for new projects"),
+    ):
+        command = commands.add_parser(name, help=help)
+        if name == "test":
+            command.add_argument("--test", default="test_data.csv")
+        else:
+            command.add_argument("file", help="CSV with raw CBO, WMC and NOC columns")
+            command.add_argument("--output", help="CSV file (default: stdout)")
+        command.add_argument("--model", default=os.path.join(data_dir, "model"), help="model artifact directory")
+        command.add_argument("--train", default="train_data.csv", help="fit from this file if there is no artifact")
+        command.set_defaults(handler=handler)
+
+    command = commands.add_parser("vif", help="correlations and variance inflation factors")
+    command.add_argument("file")
+    command.add_argument("--threshold", type=float, default=0.7)
+    command.set_defaults(handler=command_vif, needs=("pandas",))
+
+    command = commands.add_parser("mardia", help="Mardia's multivariate normality tests")
+    command.add_argument("file")
+    command.add_argument(
+        "--absolute", dest="relative", action="store_false", help="do not divide CBO, WMC and RFC by NOC"
+    )
+    command.set_defaults(handler=command_mardia, needs=("pandas", "scipy.stats"))
+    return parser
+
+
+def main(argv: List[str] = None) -> None:
+    start = time.perf_counter()
+    args = build_parser().parse_args(argv)
+    for name in getattr(args, "needs", ()):
+        imports(name)
+    args.handler(args)
+    if args.import_time:
+        modules = sorted(m for m in ("pandas", "scipy", "statsmodels") if m in sys.modules)
+        print(
+            f"\nImports: {imports.seconds:.3f}s of {time.perf_counter() - start:.3f}s "
+            f"(heavy modules loaded: {', '.join(modules) or 'none'})",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Tuple
+from model import calculate_regression_metrics, retrieve_data
+from ols import OLSSolver, batched_lstsq
+from splits import split_indices
+
+Split = Tuple[np.ndarray, np.ndarray]
+
+
+def kfold_splits(
+    n: int, k: int = 10, rng: Optional[np.random.Generator] = None
+) -> List[Split]:
+    """Return (train, test) index arrays for k shuffled folds."""
+    if not 2 <= k <= n:
+        raise ValueError("k must be between 2 and the number of samples")
+    rng = np.random.default_rng(rng)
+    folds = np.array_split(rng.permutation(n), k)
+    return [
+        (np.concatenate(folds[:i] + folds[i + 1:]), test)
+        for i, test in enumerate(folds)
+    ]
+
+
+def random_splits(
+    n: int,
+    train_ratio: float = 0.6,
+    n_repeats: int = 100,
+    rng: Optional[np.random.Generator] = None,
+) -> List[Split]:
+    """Return (train, test) index arrays for repeated random splits."""
+    return list(zip(*split_indices(n, train_ratio, n_repeats, rng)))
+
+
+def evaluate_splits(Z: np.ndarray, splits: List[Split], chunk_size: int = 100) -> np.ndarray:
+    """
+    Fit on each training set and score on its test set.
+
+    Z holds the predictors followed by the response column. Splits with equal
+    train/test sizes are solved as batched least squares problems of at most
+    `chunk_size` splits, so memory stays at O(chunk_size * n * p).
+    Returns an (len(splits), 3) array of R^2, MMRE and PRED.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer")
+    X = np.column_stack((np.ones(Z.shape[0]), Z[:, :-1]))
+    y = Z[:, -1]
+    metrics = np.empty((len(splits), 3))
+    groups = {}
+    for i, (train, test) in enumerate(splits):
+        groups.setdefault((len(train), len(test)), []).append(i)
+    for group in groups.values():
+        for start in range(0, len(group), chunk_size):
+            members = group[start:start + chunk_size]
+            train = np.stack([splits[i][0] for i in members])
+            test = np.stack([splits[i][1] for i in members])
+            coefficients = batched_lstsq(X[train], y[train][:, :, np.newaxis])[:, :, 0]
+            y_hat = np.einsum("mnk,mk->mn", X[test], coefficients)
+            metrics[members] = np.column_stack(calculate_regression_metrics(y[test], y_hat))
+    return metrics
+
+
+def loo_predictions(Z: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return leave-one-out predictions and PRESS residuals from a single fit.
+
+    Deleting observation i changes its residual to e_i / (1 - h_ii), so no
+    refits are needed.
+    """
+    solver = OLSSolver(Z[:, :-1])
+    y = Z[:, -1]
+    press_residuals = solver.residuals(y) / (1 - solver.leverage())
+    return y - press_residuals, press_residuals
+
+
+def cross_validate(
+    Z: np.ndarray,
+    method: str = "kfold",
+    k: int = 10,
+    n_repeats: int = 100,
+    train_ratio: float = 0.6,
+    seed: Optional[int] = None,
+    workers: int = 1,
+) -> pd.DataFrame:
+    """
+    Cross-validate the regression of the last column of Z on the others.
+
+    `method` is "kfold", "repeated" (random train/test splits) or "loo". For
+    "loo" a single row is returned with the metrics of the leave-one-out
+    predictions and the PRESS statistic. With `workers` > 1 the splits are
+    evaluated in a process pool.
+    """
+    if method == "loo":
+        y_loo, press_residuals = loo_predictions(Z)
+        r_squared, mmre, pred = calculate_regression_metrics(Z[:, -1], y_loo)
+        return pd.DataFrame(
+            [
+                {
+                    "split": 0,
+                    "r_squared": r_squared,
+                    "mmre": mmre,
+                    "pred": pred,
+                    "press": np.sum(press_residuals**2),
+                }
+            ]
+        )
+
+    rng = np.random.default_rng(seed)
+    if method == "kfold":
+        splits = kfold_splits(Z.shape[0], k, rng)
+    elif method == "repeated":
+        splits = random_splits(Z.shape[0], train_ratio, n_repeats, rng)
+    else:
+        raise ValueError(f"Unknown cross-validation method: {method}")
+
+    if workers > 1:
+        chunks = [splits[i::workers] for i in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(evaluate_splits, [Z] * workers, chunks))
+        metrics = np.empty((len(splits), 3))
+        for i, result in enumerate(results):
+            metrics[i::workers] = result
+    else:
+        metrics = evaluate_splits(Z, splits)
+
+    results = pd.DataFrame(metrics, columns=["r_squared", "mmre", "pred"])
+    results.insert(0, "split", np.arange(len(splits)))
+    return results
+
+
+def main():
+    projects = retrieve_data(normalized=True)
+    Z = np.column_stack((projects.zx1, projects.zx2, projects.zy))
+    for method in ("kfold", "repeated", "loo"):
+        results = cross_validate(Z, method=method, seed=0)
+        print(f"\n{method} cross-validation ({len(results)} splits):")
+        print(results.drop(columns="split").mean().to_string())
+
+
+if __name__ == "__main__":
+    main()
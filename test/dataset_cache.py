@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+from typing import Optional
+from project_table import NUMERIC_COLUMNS, ProjectTable
+from transforms import ColumnTransforms, column_transform, transform_spec
+
+cache_dir = os.path.join(os.path.dirname(__file__), "data", ".cache")
+INDEX_FILE = "index.json"
+# bump when the on-disk layout changes
+CACHE_VERSION = 2
+# sidecar directories and the index are readable by other users' processes
+SIDECAR_MODE = 0o755
+INDEX_MODE = 0o644
+
+
+def file_digest(path: str) -> str:
+    """
+    Return the SHA-256 of a file, reusing the digest recorded in the cache
+    index while the file's size and mtime are unchanged.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    index_path = os.path.join(cache_dir, INDEX_FILE)
+    try:
+        with open(index_path) as file:
+            index = json.load(file)
+    except (OSError, ValueError):
+        index = {}
+
+    entry = index.get(path)
+    if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+        return entry["sha256"]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    index[path] = {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": digest.hexdigest(),
+    }
+    staging = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        descriptor, staging = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(descriptor, "w") as file:
+            json.dump(index, file, indent=2)
+        os.chmod(staging, INDEX_MODE)
+        os.replace(staging, index_path)
+    except OSError:
+        # the index only saves rehashing; a cache owned by another user is read-only
+        if staging is not None and os.path.exists(staging):
+            os.remove(staging)
+    return digest.hexdigest()
+
+
+def cache_key(path: str, relative: bool, transform: Optional[ColumnTransforms]) -> str:
+    """Key a sidecar on the file contents and on what is computed from them."""
+    variant = "relative" if relative else "absolute"
+    if transform is not None:
+        variant += json.dumps(transform_spec(transform), sort_keys=True)
+    key = hashlib.sha256(
+        f"{CACHE_VERSION}:{file_digest(path)}:{variant}".encode()
+    ).hexdigest()[:16]
+    return f"{os.path.splitext(os.path.basename(path))[0]}-{key}"
+
+
+def write_sidecar(directory: str, table: ProjectTable) -> None:
+    """Write every column as a .npy file; URLs become a fixed-width string table."""
+    np.save(os.path.join(directory, "url.npy"), table.url.astype(str))
+    for name in NUMERIC_COLUMNS:
+        np.save(os.path.join(directory, f"{name}.npy"), getattr(table, name))
+
+
+def read_sidecar(directory: str) -> ProjectTable:
+    """Memory-map the columns of a sidecar directory."""
+    return ProjectTable(
+        url=np.load(os.path.join(directory, "url.npy"), mmap_mode="r"),
+        **{
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+            for name in NUMERIC_COLUMNS
+        },
+    )
+
+
+def load_table(
+    path: str, relative: bool = False, transform: Optional[ColumnTransforms] = None
+) -> ProjectTable:
+    """
+    Load a metrics CSV through the binary cache.
+
+    On the first call the CSV is parsed, given z-columns with `transform` if
+    one is passed, and written as .npy columns under `cache_dir`. Later calls
+    with an unchanged file and transform memory-map those columns read-only,
+    so startup is almost instant and worker processes share the pages.
+    """
+    directory = os.path.join(cache_dir, cache_key(path, relative, transform))
+    if os.path.isdir(directory):
+        return read_sidecar(directory)
+
+    table = ProjectTable.from_csv(path, relative=relative)
+    if transform is not None:
+        table = table.with_columns(
+            zx1=column_transform(transform, "x1").forward(table.x1),
+            zx2=column_transform(transform, "x2").forward(table.x2),
+            zy=column_transform(transform, "y").forward(table.y),
+        )
+
+    os.makedirs(cache_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=cache_dir)
+    os.chmod(staging, SIDECAR_MODE)
+    try:
+        write_sidecar(staging, table)
+        os.replace(staging, directory)
+    except OSError:
+        # another process finished the same sidecar first
+        shutil.rmtree(staging, ignore_errors=True)
+    return read_sidecar(directory)
+
+
+def clear_cache() -> None:
+    shutil.rmtree(cache_dir, ignore_errors=True)
@@ -0,0 +1,148 @@
+from dataclasses import dataclass
+import numpy as np
+from typing import Optional, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class IterationStats:
+    iteration: int
+    rows: int
+    removed: int
+    seconds: float
+
+
+def cholesky_downdate(L: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """
+    Return the lower Cholesky factor of L @ L.T - outer(x, x) in O(p**2).
+
+    Raises np.linalg.LinAlgError if the result is not positive definite.
+    """
+    L = L.copy()
+    x = np.array(x, dtype=float)
+    p = L.shape[0]
+    for k in range(p):
+        r_squared = L[k, k] ** 2 - x[k] ** 2
+        if r_squared <= 0:
+            raise np.linalg.LinAlgError("Downdated matrix is not positive definite.")
+        r = np.sqrt(r_squared)
+        c = r / L[k, k]
+        s = x[k] / L[k, k]
+        L[k, k] = r
+        if k + 1 < p:
+            L[k + 1:, k] = (L[k + 1:, k] - s * x[k + 1:]) / c
+            x[k + 1:] = c * x[k + 1:] - s * L[k + 1:, k]
+    return L
+
+
+class SufficientStatistics:
+    """
+    Running sums of Z = [predictors..., response] for the outlier tests.
+
+    Keeps the cross-product matrix G = A.T @ A of A = [1, Z], from which the
+    mean, covariance and normal equations are read, and the Cholesky factor
+    of X.T @ X for X = [1, predictors]. Adding or removing k rows updates both
+    in O(k * p**2), so the statistics can be built from chunks of a file that
+    never fits in memory.
+    """
+
+    def __init__(self, p: int):
+        self.gram = np.zeros((p + 1, p + 1))
+        self.chol: Optional[np.ndarray] = None
+
+    @staticmethod
+    def augment(Z: np.ndarray) -> np.ndarray:
+        return np.column_stack((np.ones(Z.shape[0]), Z))
+
+    def _factor(self) -> np.ndarray:
+        try:
+            return np.linalg.cholesky(self.gram[:-1, :-1])
+        except np.linalg.LinAlgError:
+            raise ValueError(
+                "Matrix inversion failed during regression coefficient calculation."
+            )
+
+    def add(self, Z: np.ndarray) -> None:
+        """Add rows; the Cholesky factor is rebuilt on next use."""
+        A = self.augment(Z)
+        self.gram += A.T @ A
+        self.chol = None
+
+    def remove_rows(self, Z: np.ndarray) -> None:
+        """Downdate the statistics by rows that were previously added."""
+        if Z.shape[0] == 0:
+            return
+        A = self.augment(Z)
+        self.gram -= A.T @ A
+        if self.chol is None:
+            return
+        try:
+            for x in A[:, :-1]:
+                self.chol = cholesky_downdate(self.chol, x)
+        except np.linalg.LinAlgError:
+            # Downdating lost positive definiteness; refactor from the statistics.
+            self.chol = None
+
+    @property
+    def n(self) -> int:
+        return int(round(self.gram[0, 0]))
+
+    def factor(self) -> np.ndarray:
+        """Lower Cholesky factor of X.T @ X."""
+        if self.chol is None:
+            self.chol = self._factor()
+        return self.chol
+
+    def mean(self) -> np.ndarray:
+        return self.gram[0, 1:] / self.n
+
+    def covariance(self) -> np.ndarray:
+        """Sample covariance (n - 1 denominator) of the rows."""
+        mean = self.mean()
+        return (self.gram[1:, 1:] - self.n * np.outer(mean, mean)) / (self.n - 1)
+
+    def cov_inv(self) -> np.ndarray:
+        try:
+            return np.linalg.inv(self.covariance())
+        except np.linalg.LinAlgError:
+            raise ValueError("Covariance matrix is singular and cannot be inverted.")
+
+    def coefficients(self) -> Tuple[float, ...]:
+        """OLS coefficients [b0, b1, ...] of the response on the predictors."""
+        from scipy.linalg import cho_solve
+
+        return tuple(cho_solve((self.factor(), True), self.gram[:-1, -1]))
+
+    def leverage(self, X: np.ndarray) -> np.ndarray:
+        """Return diag(X @ inv(X.T @ X) @ X.T) for rows X = [1, predictors]."""
+        from scipy.linalg import solve_triangular
+
+        U = solve_triangular(self.factor(), X.T, lower=True)
+        return np.sum(U**2, axis=0)
+
+
+class IncrementalFit(SufficientStatistics):
+    """
+    SufficientStatistics over an in-memory Z for repeated outlier removal.
+
+    Removing k rows downdates the statistics in O(k * p**2) instead of
+    refitting over the remaining rows.
+    """
+
+    def __init__(self, Z: np.ndarray):
+        self.Z = np.asarray(Z, dtype=float)
+        super().__init__(self.Z.shape[1])
+        self.active = np.arange(self.Z.shape[0])
+        self.add(self.Z)
+        self.factor()
+
+    def rows(self) -> np.ndarray:
+        """Return the rows of Z that have not been removed."""
+        return self.Z[self.active]
+
+    def remove(self, positions: Sequence[int]) -> None:
+        """Remove rows by their position among the remaining rows."""
+        positions = np.unique(np.asarray(positions, dtype=np.intp))
+        if positions.size == 0:
+            return
+        self.remove_rows(self.Z[self.active[positions]])
+        self.active = np.delete(self.active, positions)
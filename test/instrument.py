@@ -0,0 +1,228 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, TextIO
+
+# Set to "table" for a summary on exit, "jsonl" for JSON lines on stderr, or
+# a file path to append JSON lines to. Unset (or "0") disables instrumentation.
+ENV_VAR = "STATS_INSTRUMENT"
+
+
+@dataclass(frozen=True)
+class StageRecord:
+    """Measurements of one run of a stage."""
+
+    stage: str
+    wall_seconds: float
+    cpu_seconds: float
+    # traced bytes (NumPy buffers included) still held at the end of the stage,
+    # and the highest traced usage during it, both relative to its start
+    allocated_bytes: int
+    peak_bytes: int
+    rows: Optional[int]
+    iteration: Optional[int]
+
+
+_enabled = False
+_mode = "table"
+_sink: Optional[TextIO] = None
+_records: List[StageRecord] = []
+_stack: List["_Stage"] = []
+_report_registered = False
+_started_tracemalloc = False
+
+
+class _Stage:
+    def __init__(self, name: str, rows: Optional[int], iteration: Optional[int]):
+        self.name = name
+        self.rows = rows
+        self.iteration = iteration
+
+    def __enter__(self) -> "_Stage":
+        if _stack:
+            parent = _stack[-1]
+            self.name = f"{parent.name}/{self.name}"
+            if self.iteration is None:
+                self.iteration = parent.iteration
+            # keep the parent's peak before this stage resets the counter
+            parent.peak = max(parent.peak, tracemalloc.get_traced_memory()[1])
+        _stack.append(self)
+        tracemalloc.reset_peak()
+        self.memory, self.peak = tracemalloc.get_traced_memory()
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        memory, peak = tracemalloc.get_traced_memory()
+        peak = max(self.peak, peak)
+        _stack.pop()
+        if _stack:
+            _stack[-1].peak = max(_stack[-1].peak, peak)
+        record(
+            StageRecord(
+                self.name, wall, cpu, memory - self.memory, peak - self.memory, self.rows, self.iteration
+            )
+        )
+
+
+class _DisabledStage:
+    def __enter__(self) -> "_DisabledStage":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_DISABLED = _DisabledStage()
+
+
+def stage(name: str, rows: Optional[int] = None, iteration: Optional[int] = None):
+    """
+    Context manager measuring wall time, CPU time and the memory a stage
+    allocates, traced with tracemalloc while instrumentation is enabled.
+
+    Nested stages are named parent/child and inherit the parent's iteration.
+    When instrumentation is disabled a shared no-op context is returned.
+    """
+    if not _enabled:
+        return _DISABLED
+    return _Stage(name, rows, iteration)
+
+
+def row_count(value) -> Optional[int]:
+    """Return the number of rows of a ProjectTable or numpy array, else None."""
+    if hasattr(value, "shape") and len(value.shape) > 0:
+        return value.shape[0]
+    if hasattr(value, "take") and hasattr(value, "__len__"):
+        return len(value)
+    return None
+
+
+def instrumented(
+    name: Optional[str] = None, rows: Optional[Callable[..., Optional[int]]] = None
+) -> Callable:
+    """
+    Decorator running a function as a stage.
+
+    `rows` is called with the function's arguments to count the rows it
+    processes. By default the row count is the length of the first argument,
+    or else of the result, if that is a table or array.
+    """
+
+    def decorator(function: Callable) -> Callable:
+        stage_name = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            if rows is not None:
+                count = rows(*args, **kwargs)
+            else:
+                count = row_count(args[0]) if args else None
+            with _Stage(stage_name, count, None) as s:
+                result = function(*args, **kwargs)
+                if s.rows is None:
+                    s.rows = row_count(result)
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+def record(stage_record: StageRecord) -> None:
+    _records.append(stage_record)
+    if _mode == "jsonl" and _sink is not None:
+        _sink.write(json.dumps(asdict(stage_record)) + "\n")
+        _sink.flush()
+
+
+def enable(mode: str = "table", path: Optional[str] = None) -> None:
+    """
+    Turn instrumentation on.
+
+    In "jsonl" mode every stage is written as a JSON line to `path` (appended)
+    or stderr. In "table" mode a summary is printed to stderr at exit.
+    """
+    global _enabled, _mode, _sink, _report_registered, _started_tracemalloc
+    if mode not in ("table", "jsonl"):
+        raise ValueError("mode must be 'table' or 'jsonl'")
+    _enabled, _mode = True, mode
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracemalloc = True
+    if mode == "jsonl":
+        _sink = open(path, "a") if path else sys.stderr
+    elif not _report_registered:
+        atexit.register(report)
+        _report_registered = True
+
+
+def disable() -> None:
+    global _enabled, _sink, _started_tracemalloc
+    _enabled = False
+    if _started_tracemalloc:
+        tracemalloc.stop()
+        _started_tracemalloc = False
+    if _sink is not None and _sink is not sys.stderr:
+        _sink.close()
+    _sink = None
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def records() -> List[StageRecord]:
+    return list(_records)
+
+
+def summary() -> str:
+    """Return a table of calls, total times, allocated and peak MiB and rows per stage."""
+    totals: Dict[str, List[float]] = {}
+    for r in _records:
+        total = totals.setdefault(r.stage, [0, 0.0, 0.0, 0, 0, 0])
+        total[0] += 1
+        total[1] += r.wall_seconds
+        total[2] += r.cpu_seconds
+        total[3] += r.allocated_bytes
+        total[4] = max(total[4], r.peak_bytes)
+        total[5] += r.rows or 0
+    lines = [
+        f"{'stage':<40}{'calls':>7}{'wall s':>10}{'cpu s':>10}{'alloc MiB':>11}{'peak MiB':>10}{'rows':>12}"
+    ]
+    for name, (calls, wall, cpu, allocated, peak, rows) in totals.items():
+        lines.append(
+            f"{name:<40}{calls:>7}{wall:>10.4f}{cpu:>10.4f}"
+            f"{allocated / 2**20:>11.2f}{peak / 2**20:>10.2f}{rows:>12}"
+        )
+    return "\n".join(lines)
+
+
+def report() -> None:
+    if _records:
+        print(summary(), file=sys.stderr)
+
+
+def enable_from_environment() -> None:
+    value = os.environ.get(ENV_VAR, "")
+    if value in ("", "0"):
+        return
+    if value in ("1", "table"):
+        enable("table")
+    elif value == "jsonl":
+        enable("jsonl")
+    else:
+        enable("jsonl", value)
+
+
+enable_from_environment()
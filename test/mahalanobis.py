@@ -0,0 +1,154 @@
+import numpy as np
+from typing import Optional, Tuple
+from quantiles import critical_value
+
+# rows per block when gathering per-group factors in grouped_distances
+group_block_size = 65536
+
+
+def cholesky_factor(covariance: np.ndarray) -> np.ndarray:
+    """Return the lower Cholesky factor of a covariance matrix."""
+    try:
+        return np.linalg.cholesky(covariance)
+    except np.linalg.LinAlgError:
+        raise ValueError("Covariance matrix is singular and cannot be inverted.")
+
+
+def covariance_factor(Z: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the mean and the lower Cholesky factor of the covariance of Z."""
+    mean = np.mean(Z, axis=0)
+    covariance = np.cov(Z - mean, rowvar=False, ddof=1).reshape(Z.shape[1], Z.shape[1])
+    return mean, cholesky_factor(covariance)
+
+
+def factor_inverse(L: np.ndarray) -> np.ndarray:
+    """Return inv(L @ L.T) from the Cholesky factor L."""
+    from scipy.linalg import cho_solve
+
+    return cho_solve((L, True), np.eye(L.shape[-1]))
+
+
+def squared_distances(Z: np.ndarray, mean: np.ndarray, L: np.ndarray) -> np.ndarray:
+    """
+    Return the squared Mahalanobis distance of each row of Z.
+
+    Solves L w = z - mean instead of forming the inverse covariance, so
+    d^2 = w . w.
+    """
+    from scipy.linalg import solve_triangular
+
+    W = solve_triangular(L, (Z - mean).T, lower=True)
+    return np.einsum("ij,ij->j", W, W)
+
+
+def test_statistic(n, p: int, squared: np.ndarray) -> np.ndarray:
+    """Hotelling-type statistic of squared distances, F(p, n - p) distributed."""
+    return ((n - p) * n / ((n**2 - 1) * p)) * squared
+
+
+def find_outliers(Z: np.ndarray, alpha: float = 0.005) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the outlier mask and test statistics of the rows of an (n, p) array."""
+    n, p = Z.shape
+    mean, L = covariance_factor(Z)
+    statistic = test_statistic(n, p, squared_distances(Z, mean, L))
+    return statistic > critical_value("f", 1 - alpha, p, n - p), statistic
+
+
+def group_moments(
+    Z: np.ndarray, labels: np.ndarray, n_groups: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return per-group counts, means and covariances with bincount reductions."""
+    p = Z.shape[1]
+    counts = np.bincount(labels, minlength=n_groups)
+    means = np.column_stack(
+        [np.bincount(labels, weights=Z[:, j], minlength=n_groups) for j in range(p)]
+    ) / np.maximum(counts, 1)[:, np.newaxis]
+    centered = Z - means[labels]
+    covariances = np.empty((n_groups, p, p))
+    for j in range(p):
+        for k in range(j, p):
+            products = np.bincount(labels, weights=centered[:, j] * centered[:, k], minlength=n_groups)
+            covariances[:, j, k] = covariances[:, k, j] = products
+    covariances /= np.maximum(counts - 1, 1)[:, np.newaxis, np.newaxis]
+    return counts, means, covariances
+
+
+def grouped_distances(
+    Z: np.ndarray, groups: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Return squared Mahalanobis distances of every row to its own group.
+
+    Means and covariances of all groups are computed in one pass and
+    factored as a batch. Rows of groups with no more than p rows, or with a
+    singular covariance, get NaN. Returns (squared distances, group sizes
+    per row, group labels).
+    """
+    n, p = Z.shape
+    _, labels = np.unique(groups, return_inverse=True)
+    labels = labels.reshape(-1)
+    n_groups = labels.max() + 1 if n else 0
+    counts, means, covariances = group_moments(Z, labels, n_groups)
+
+    sign, _ = np.linalg.slogdet(covariances)
+    valid = (counts > p) & (sign > 0)
+    inverse_factors = np.full((n_groups, p, p), np.nan)
+    if valid.any():
+        inverse_factors[valid] = np.linalg.inv(np.linalg.cholesky(covariances[valid]))
+
+    squared = np.empty(n)
+    for start in range(0, n, group_block_size):
+        block = slice(start, start + group_block_size)
+        W = np.einsum(
+            "ijk,ik->ij", inverse_factors[labels[block]], Z[block] - means[labels[block]]
+        )
+        squared[block] = np.einsum("ij,ij->i", W, W)
+    return squared, counts[labels], labels
+
+
+def find_group_outliers(
+    Z: np.ndarray, groups: np.ndarray, alpha: float = 0.005
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Flag Mahalanobis outliers within each group, e.g. per organization.
+
+    Returns the outlier mask and the test statistics; rows of groups too
+    small to estimate a covariance are never flagged and have NaN statistics.
+    """
+    p = Z.shape[1]
+    squared, sizes, _ = grouped_distances(Z, groups)
+    critical = np.full(len(sizes), np.inf)
+    for size in np.unique(sizes[sizes > p]):
+        critical[sizes == size] = critical_value("f", 1 - alpha, p, size - p)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        statistic = test_statistic(sizes, p, squared)
+        return statistic > critical, statistic
+
+
+def organization(urls: np.ndarray) -> np.ndarray:
+    """Return the owner part of GitHub project URLs."""
+    return np.array([url.rstrip("/").split("/")[-2] for url in urls.astype(str)])
+
+
+def main(path: Optional[str] = None):
+    import os
+    import pandas as pd
+
+    path = path or os.path.join(os.path.dirname(__file__), "..", "assets", "dataset.csv")
+    metrics = ["SLOC", "NOC", "NOM", "DIT", "RFC", "CBO", "WMC"]
+    df = pd.read_csv(path)
+    df = df[(df[metrics] > 0).all(axis=1)]
+    Z = np.log10(df[metrics].to_numpy(dtype=float))
+
+    outliers, statistic = find_outliers(Z)
+    print(f"{outliers.sum()} of {len(Z)} projects are outliers on {len(metrics)} log metrics:")
+    for url, ts in zip(df["URL"][outliers], statistic[outliers]):
+        print(f"  {url} (TS: {ts:.4f})")
+
+    groups = organization(df["URL"].to_numpy())
+    outliers, _ = find_group_outliers(Z, groups)
+    print(f"{outliers.sum()} outliers within {len(np.unique(groups))} organizations")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import numpy as np
+from typing import List, Optional, Tuple
+from quantiles import critical_value
+
+# Candidate subsets are refined with two C-steps each, and the best
+# `n_best` of them are iterated until their determinant stops decreasing.
+n_starts = 500
+n_best = 10
+max_c_steps = 100
+# restarts run on a random subsample of at most this many rows; only the
+# best candidates are concentrated on the full data
+subsample_size = 1500
+# quantile of chi2(p) beyond which points get zero weight in the reweighting step
+reweight_quantile = 0.975
+
+Candidate = Tuple[float, np.ndarray]
+
+
+@dataclass(frozen=True)
+class MCDResult:
+    """Robust location and scatter from the Minimum Covariance Determinant."""
+
+    location: np.ndarray
+    covariance: np.ndarray
+    support: np.ndarray
+    raw_location: np.ndarray
+    raw_covariance: np.ndarray
+    log_determinant: float
+
+    def cov_inv(self) -> np.ndarray:
+        return np.linalg.inv(self.covariance)
+
+    def distances(self, Z: np.ndarray) -> np.ndarray:
+        """Return the squared robust Mahalanobis distance of each row of Z."""
+        return squared_distances(Z, self.location, self.cov_inv())
+
+
+def squared_distances(Z: np.ndarray, location: np.ndarray, cov_inv: np.ndarray) -> np.ndarray:
+    centered = Z - location
+    return np.einsum("ij,ij->i", centered @ cov_inv, centered)
+
+
+def subset_estimate(Z: np.ndarray, subset: np.ndarray) -> Tuple[np.ndarray, np.ndarray, float]:
+    """Return the mean, covariance and log-determinant of the rows in `subset`."""
+    X = Z[subset]
+    location = X.mean(axis=0)
+    covariance = np.cov(X, rowvar=False)
+    sign, log_determinant = np.linalg.slogdet(covariance)
+    return location, covariance, log_determinant if sign > 0 else -np.inf
+
+
+def c_steps(
+    Z: np.ndarray, subset: np.ndarray, h: int, n_steps: int = max_c_steps
+) -> Candidate:
+    """
+    Apply up to `n_steps` concentration steps to an h-subset.
+
+    Each step keeps the h points closest to the current subset's mean and
+    covariance, which never increases the covariance determinant.
+    Returns (log_determinant, subset).
+    """
+    location, covariance, log_determinant = subset_estimate(Z, subset)
+    for _ in range(n_steps):
+        if log_determinant == -np.inf:
+            # exact fit of h points; this subset cannot be improved
+            break
+        distances = squared_distances(Z, location, np.linalg.inv(covariance))
+        new_subset = np.argpartition(distances, h - 1)[:h]
+        location, covariance, new_log_determinant = subset_estimate(Z, new_subset)
+        subset = new_subset
+        if new_log_determinant >= log_determinant:
+            log_determinant = new_log_determinant
+            break
+        log_determinant = new_log_determinant
+    return log_determinant, subset
+
+
+def initial_subset(Z: np.ndarray, h: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draw a random (p + 1)-subset, enlarging it until its covariance is
+    non-singular, and return the h points closest to its estimate.
+    """
+    n, p = Z.shape
+    order = rng.permutation(n)
+    size = p + 1
+    while True:
+        location, covariance, log_determinant = subset_estimate(Z, order[:size])
+        if log_determinant > -np.inf or size >= n:
+            break
+        size += 1
+    if log_determinant == -np.inf:
+        return order[:h]
+    distances = squared_distances(Z, location, np.linalg.inv(covariance))
+    return np.argpartition(distances, h - 1)[:h]
+
+
+def best_candidates(
+    Z: np.ndarray, h: int, starts: int, keep: int, seed: np.random.SeedSequence
+) -> List[Candidate]:
+    """Refine `starts` random subsets with two C-steps and keep the best `keep`."""
+    rng = np.random.default_rng(seed)
+    candidates = [c_steps(Z, initial_subset(Z, h, rng), h, n_steps=2) for _ in range(starts)]
+    candidates.sort(key=lambda candidate: candidate[0])
+    return candidates[:keep]
+
+
+def full_subset(Z: np.ndarray, sample: np.ndarray, subset: np.ndarray, h: int) -> np.ndarray:
+    """Return the h rows of Z closest to the estimate of a subsample's subset."""
+    if sample is Z:
+        return subset
+    location, covariance, log_determinant = subset_estimate(sample, subset)
+    if log_determinant == -np.inf:
+        return subset
+    distances = squared_distances(Z, location, np.linalg.inv(covariance))
+    return np.argpartition(distances, h - 1)[:h]
+
+
+def consistency_factor(distances: np.ndarray, p: int) -> float:
+    """Scale making the covariance consistent at the normal model."""
+    return float(np.median(distances) / critical_value("chi2", 0.5, p))
+
+
+def reweight_factor(cutoff: float, p: int) -> float:
+    """
+    Scale making the covariance of the points with d^2 <= cutoff consistent
+    at the normal model: the chi2(p) quantile level over chi2(p + 2).cdf.
+    """
+    from scipy.stats import chi2
+
+    return float(reweight_quantile / chi2.cdf(cutoff, p + 2))
+
+
+def fast_mcd(
+    Z: np.ndarray,
+    support_fraction: Optional[float] = None,
+    starts: int = n_starts,
+    seed: Optional[int] = None,
+    workers: int = 1,
+) -> MCDResult:
+    """
+    Estimate the robust location and covariance of Z with FAST-MCD.
+
+    `support_fraction` is the share h / n of points in the MCD subset; by
+    default h = (n + p + 1) // 2, the maximal breakdown point. With
+    `workers` > 1 the random restarts run in a process pool. The raw
+    estimate is corrected for consistency and then reweighted using the
+    points within the 0.975 chi2(p) quantile, with the truncation
+    correction of robustbase::covMcd.
+    """
+    n, p = Z.shape
+    if n <= p + 1:
+        raise ValueError("MCD needs more samples than features + 1")
+    if support_fraction is None:
+        h = (n + p + 1) // 2
+    else:
+        if not 0 < support_fraction <= 1:
+            raise ValueError("support_fraction must be between 0 and 1")
+        h = max(int(np.ceil(support_fraction * n)), p + 1)
+
+    seeds = np.random.SeedSequence(seed).spawn(max(workers, 1) + 1)
+    sample = Z
+    if n > subsample_size:
+        sample = Z[np.random.default_rng(seeds.pop()).choice(n, subsample_size, replace=False)]
+    h_sample = max(int(np.ceil(h / n * len(sample))), p + 1)
+
+    if workers > 1:
+        shares = [len(share) for share in np.array_split(np.arange(starts), workers)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(
+                best_candidates,
+                [sample] * workers,
+                [h_sample] * workers,
+                shares,
+                [n_best] * workers,
+                seeds,
+            )
+            candidates = [candidate for result in results for candidate in result]
+    else:
+        candidates = best_candidates(sample, h_sample, starts, n_best, seeds[0])
+
+    log_determinant, subset = min(
+        (c_steps(Z, full_subset(Z, sample, subset, h), h) for _, subset in candidates),
+        key=lambda candidate: candidate[0],
+    )
+    if log_determinant == -np.inf:
+        raise ValueError("MCD covariance is singular: more than h points lie on a hyperplane.")
+
+    raw_location, raw_covariance, _ = subset_estimate(Z, subset)
+    distances = squared_distances(Z, raw_location, np.linalg.inv(raw_covariance))
+    factor = consistency_factor(distances, p)
+    raw_covariance = raw_covariance * factor
+    distances = distances / factor
+
+    cutoff = critical_value("chi2", reweight_quantile, p)
+    support = distances <= cutoff
+    location, covariance, _ = subset_estimate(Z, np.flatnonzero(support))
+    covariance = covariance * reweight_factor(cutoff, p)
+
+    return MCDResult(
+        location=location,
+        covariance=covariance,
+        support=support,
+        raw_location=raw_location,
+        raw_covariance=raw_covariance,
+        log_determinant=float(log_determinant),
+    )
@@ -1,90 +1,86 @@
-from dataclasses import dataclass
-import pandas as pd
 import numpy as np
-from typing import List, Tuple
-from scipy.stats import t
+from typing import Optional, Tuple
 import os
+from project_table import ProjectTable
+from dataset_cache import load_table
+from transforms import LOG10, ColumnTransforms, Transform, column_transform
+from ols import OLSSolver
+from quantiles import critical_value
+from instrument import instrumented
+from prediction import FittedModel, save_model
 
 alpha = 0.05
 
 
-@dataclass(frozen=True)
-class Project:
-    url: str
-    x1: float
-    x2: float
-    y: float
-    zx1: float = 0.0
-    zx2: float = 0.0
-    zy: float = 0.0
-
-
 def data_path(filename: str) -> str:
     """Return the full path to the data file."""
     return os.path.join(os.path.dirname(__file__), "data", filename)
 
 
-def retrieve_data(filename: str = "train_data.csv") -> List[Project]:
-    """Load data from CSV file and return a list of Project objects."""
-    df = pd.read_csv(data_path(filename))
-    projects = []
-    for _, row in df.iterrows():
-        project = Project(
-            url=row["URL"],
-            x1=row["CBO"],
-            x2=row["WMC"],
-            y=row["RFC"],
-        )
-        projects.append(project)
-    return projects
-
-
-def normalize_data(projects: List[Project]) -> List[Project]:
-    """Normalize the data."""
-    normalized_projects = []
-    for project in projects:
-        zx1 = np.log10(project.x1)
-        zx2 = np.log10(project.x2)
-        zy = np.log10(project.y)
-
-        normalized_projects.append(
-            Project(
-                url=project.url,
-                x1=project.x1,
-                x2=project.x2,
-                y=project.y,
-                zx1=zx1,
-                zx2=zx2,
-                zy=zy,
-            )
-        )
+@instrumented("load")
+def retrieve_data(
+    filename: str = "train_data.csv", normalized: bool = False, use_cache: bool = True
+) -> ProjectTable:
+    """
+    Load data from CSV file into a columnar ProjectTable.
+
+    With `use_cache` the columns (and the z-columns if `normalized` is set) are
+    memory-mapped from the binary cache in dataset_cache.
+    """
+    transform = LOG10 if normalized else None
+    if use_cache:
+        return load_table(data_path(filename), transform=transform)
+    projects = ProjectTable.from_csv(data_path(filename))
+    return normalize_data(projects) if normalized else projects
+
 
-    return normalized_projects
+@instrumented("normalize")
+def normalize_data(
+    projects: ProjectTable, transform: ColumnTransforms = LOG10
+) -> ProjectTable:
+    """
+    Normalize the data.
+
+    `transform` is applied to whole columns; pass a mapping of "x1", "x2" and
+    "y" to transforms (see transforms.fit_transforms) to use fitted ones.
+    """
+    return projects.with_columns(
+        zx1=column_transform(transform, "x1").forward(projects.x1),
+        zx2=column_transform(transform, "x2").forward(projects.x2),
+        zy=column_transform(transform, "y").forward(projects.y),
+    )
 
 
 def calculate_regression_coefficients(
     X: np.ndarray, Y: np.ndarray
 ) -> Tuple[float, float, float]:
     """Calculate regression coefficients."""
-    X = np.column_stack((np.ones(X.shape[0]), X))
-    coffs = np.linalg.inv(X.T @ X) @ X.T @ Y
+    coffs = OLSSolver(X).solve(Y)
     return coffs[0], coffs[1], coffs[2]
 
 
 def calculate_regression_metrics(
-    Y: np.ndarray, Y_hat: np.ndarray
+    Y: np.ndarray, Y_hat: np.ndarray, transform: Transform = LOG10
 ) -> Tuple[float, float, float]:
-    """Calculate regression model metrics."""
-    n = len(Y)
-    Y_hat_original = 10**Y_hat
-    Y_original = 10**Y
+    """
+    Calculate regression model metrics.
+
+    Y and Y_hat are converted back to the original scale with the inverse of
+    the response `transform`. The metrics are taken along the last axis, so
+    stacked (..., n) arrays of several models are evaluated in one call.
+    """
+    n = Y.shape[-1]
+    Y_hat_original = transform.inverse(Y_hat)
+    Y_original = transform.inverse(Y)
 
     residuals = Y_original - Y_hat_original
-    y_mean = np.mean(Y_original)
+    y_mean = np.mean(Y_original, axis=-1, keepdims=True)
 
-    r_squared = 1 - (np.sum(residuals**2) / np.sum((Y_original - y_mean) ** 2))
-    mmre = np.mean(np.abs(residuals / Y_original))
-    pred = np.sum(np.abs(residuals / Y_original) < 0.25) / n
+    r_squared = 1 - (
+        np.sum(residuals**2, axis=-1) / np.sum((Y_original - y_mean) ** 2, axis=-1)
+    )
+    mmre = np.mean(np.abs(residuals / Y_original), axis=-1)
+    pred = np.sum(np.abs(residuals / Y_original) < 0.25, axis=-1) / n
 
     return r_squared, mmre, pred
 
@@ -97,6 +93,7 @@ def calculate_epsilon_std(Y: np.ndarray, Y_hat: np.ndarray) -> float:
     return epsilon_std
 
 
+@instrumented("ols")
 def build_model(zx1, zx2, zy) -> Tuple[float, float, float, np.ndarray]:
     """Build a regression model."""
     b0, b1, b2 = calculate_regression_coefficients(np.column_stack((zx1, zx2)), zy)
@@ -125,17 +122,27 @@ def print_results(
     )
 
 
+def _test_rows(model_coefficients, test_file="test_data.csv", projects=None) -> Optional[int]:
+    return len(projects) if projects is not None else None
+
+
+@instrumented("test", rows=_test_rows)
 def test_model(
     model_coefficients: Tuple[float, float, float],
     test_file: str = "test_data.csv",
+    projects: Optional[ProjectTable] = None,
 ) -> Tuple[float, float, float]:
-    """Test the model on a separate dataset."""
-    projects = retrieve_data(test_file)
-    projects = normalize_data(projects)
+    """
+    Test the model on a separate dataset.
+
+    If `projects` is given it is used instead of reading `test_file`.
+    """
+    if projects is None:
+        projects = retrieve_data(test_file, normalized=True)
+    else:
+        projects = normalize_data(projects)
 
-    zx1 = np.array([project.zx1 for project in projects])
-    zx2 = np.array([project.zx2 for project in projects])
-    zy = np.array([project.zy for project in projects])
+    zx1, zx2, zy = projects.zx1, projects.zx2, projects.zy
 
     b0, b1, b2 = model_coefficients
     Y_hat_test = b0 + b1 * zx1 + b2 * zx2
@@ -145,12 +152,15 @@ def test_model(
     return r_squared, mmre, pred
 
 
+@instrumented("intervals")
 def calculate_intervals(
     Z: np.ndarray,
     zy: np.ndarray,
     zy_hat: np.ndarray,
     alpha: float = 0.05,
-    verbose: bool = False
+    verbose: bool = False,
+    solver: Optional[OLSSolver] = None,
+    transform: Transform = LOG10,
 ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
     """
     Calculate prediction and confidence intervals for a regression model with log-transformed data.
@@ -168,6 +178,11 @@ def calculate_intervals(
         Significance level (default: 0.05 for 95% intervals)
     verbose : bool, optional
         If True, prints intermediate calculations (default: False)
+    solver : OLSSolver, optional
+        Already factored design matrix of Z, reused for the leverages
+    transform : Transform, optional
+        Transform of the response, inverted to return to the original scale
+        (default: log10)
     
     Returns
     -------
@@ -210,7 +225,7 @@ def calculate_intervals(
         print(f"Degrees of freedom: {nu}")
 
     # Calculate t-statistic
-    t_stat = t.ppf(1 - alpha / 2, nu)
+    t_stat = critical_value("t", 1 - alpha / 2, nu)
     if verbose:
         print(f"T-Student statistic: {t_stat:.4f}")
 
@@ -220,59 +235,38 @@ def calculate_intervals(
     if verbose:
         print(f"Residual standard deviation: {szy:.4f}")
 
-    # Calculate means for each predictor
-    Z_means = np.mean(Z, axis=0)
-    
-    # Calculate deviations from means
-    Z_centered = Z - Z_means
-
-    # Calculate covariance matrix
-    S_Z = Z_centered.T @ Z_centered
-    if verbose:
-        print("\nCovariance Matrix S_Z:")
-        print(S_Z)
-
-    # Invert covariance matrix
+    # Leverage of each observation: diag(X @ inv(X.T @ X) @ X.T) for X = [1, Z].
+    # This equals 1/N + diag(Z_centered @ S_Z_inv @ Z_centered.T) and is taken
+    # from a thin QR factorization, so the N x N hat matrix is never built.
     try:
-        S_Z_inv = np.linalg.inv(S_Z)
-    except np.linalg.LinAlgError:
+        leverage = (solver or OLSSolver(Z)).leverage()
+    except ValueError:
         raise ValueError("Covariance matrix is singular. Check for multicollinearity in predictors.")
 
     if verbose:
-        print("\nInverse Covariance Matrix S_Z_inv:")
-        print(S_Z_inv)
-
-    # Calculate quadratic form for each observation
-    # This is equivalent to diag(Z_centered @ S_Z_inv @ Z_centered.T)
-    quadratic_form = np.sum(Z_centered @ S_Z_inv * Z_centered, axis=1)
-    
-    if verbose:
-        print("\nQuadratic Form (first few values):")
-        print(quadratic_form[:5])
+        print("\nLeverage (first few values):")
+        print(leverage[:5])
 
     # Calculate intervals in log scale
-    pred_lower = zy_hat - t_stat * szy * np.sqrt(1 + 1/N + quadratic_form)
-    pred_upper = zy_hat + t_stat * szy * np.sqrt(1 + 1/N + quadratic_form)
-    conf_lower = zy_hat - t_stat * szy * np.sqrt(1/N + quadratic_form)
-    conf_upper = zy_hat + t_stat * szy * np.sqrt(1/N + quadratic_form)
+    pred_lower = zy_hat - t_stat * szy * np.sqrt(1 + leverage)
+    pred_upper = zy_hat + t_stat * szy * np.sqrt(1 + leverage)
+    conf_lower = zy_hat - t_stat * szy * np.sqrt(leverage)
+    conf_upper = zy_hat + t_stat * szy * np.sqrt(leverage)
 
     # Transform back to original scale
     return (
-        10**pred_lower,
-        10**pred_upper,
-        10**conf_lower,
-        10**conf_upper
+        transform.inverse(pred_lower),
+        transform.inverse(pred_upper),
+        transform.inverse(conf_lower),
+        transform.inverse(conf_upper)
     )
 
 
 def main():
     # Model test
-    projects = retrieve_data()
-    projects = normalize_data(projects)
+    projects = retrieve_data(normalized=True)
 
-    zx1 = np.array([project.zx1 for project in projects])
-    zx2 = np.array([project.zx2 for project in projects])
-    zy = np.array([project.zy for project in projects])
+    zx1, zx2, zy = projects.zx1, projects.zx2, projects.zy
 
     b0, b1, b2, zY_hat = build_model(zx1, zx2, zy)
 
@@ -280,7 +274,9 @@ def main():
     print_results(b0, b1, b2, r_squared, mmre, pred)
 
     # Test model on a separate dataset
-    test_r_squared, test_mmre, test_pred = test_model((b0, b1, b2))
+    test_r_squared, test_mmre, test_pred = test_model(
+        (b0, b1, b2), projects=retrieve_data("test_data.csv")
+    )
     print(
         f"Test Results: R^2 = {test_r_squared:.4f}, MMRE = {test_mmre:.4f}, PRED = {test_pred:.4f}"
     )
@@ -288,6 +284,24 @@ def main():
         np.column_stack((zx1, zx2)), zy, zY_hat, alpha=alpha
     )
 
+    # Save the fitted model so scoring processes can start without refitting
+    save_model(
+        FittedModel.fit(
+            np.column_stack((zx1, zx2)),
+            zy,
+            alpha=alpha,
+            relative=True,
+            metrics={
+                "r_squared": r_squared,
+                "mmre": mmre,
+                "pred": pred,
+                "test_r_squared": test_r_squared,
+                "test_mmre": test_mmre,
+                "test_pred": test_pred,
+            },
+        )
+    )
+
 
 if __name__ == "__main__":
     main()
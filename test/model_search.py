@@ -0,0 +1,137 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+import os
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Sequence, Tuple
+from model import calculate_regression_metrics
+from ols import batched_lstsq
+
+PREDICTORS = ("NOC", "NOM", "DIT", "CBO", "WMC", "SLOC")
+RESPONSES = ("RFC", "SLOC")
+
+
+def data_path(filename: str) -> str:
+    """Return the full path to the data file."""
+    return os.path.join(os.path.dirname(__file__), "data", filename)
+
+
+def candidate_subsets(
+    predictors: Sequence[str], response: str, max_size: Optional[int] = None
+) -> List[Tuple[str, ...]]:
+    """Return every non-empty subset of the predictors that excludes the response."""
+    available = [p for p in predictors if p != response]
+    max_size = len(available) if max_size is None else min(max_size, len(available))
+    return [
+        subset
+        for size in range(1, max_size + 1)
+        for subset in combinations(available, size)
+    ]
+
+
+def log_metrics(df: pd.DataFrame, columns: Sequence[str], relative: bool) -> np.ndarray:
+    """
+    Return log10 of the metric columns, dropping rows with non-positive values.
+
+    If `relative` is set, every metric except NOC is divided by NOC first.
+    """
+    values = df[list(columns)].to_numpy(dtype=float)
+    if relative:
+        noc = df["NOC"].to_numpy(dtype=float)[:, np.newaxis]
+        values = np.where(np.asarray(columns) == "NOC", values, values / noc)
+    values = values[np.all(values > 0, axis=1)]
+    return np.log10(values)
+
+
+def fit_response(
+    df: pd.DataFrame,
+    response: str,
+    predictors: Sequence[str] = PREDICTORS,
+    max_size: Optional[int] = None,
+    relative: bool = False,
+) -> pd.DataFrame:
+    """
+    Fit every predictor subset against one response metric.
+
+    Candidates of the same size are stacked into an (m, n, k + 1) array and
+    solved in one batched QR call.
+    """
+    subsets = candidate_subsets(predictors, response, max_size)
+    columns = sorted({c for subset in subsets for c in subset} | {response})
+    position = {c: i for i, c in enumerate(columns)}
+    Z = log_metrics(df, columns, relative)
+    zy = Z[:, position[response]]
+    n = Z.shape[0]
+
+    rows = []
+    for size in sorted({len(s) for s in subsets}):
+        group = [s for s in subsets if len(s) == size]
+        index = np.array([[position[c] for c in s] for s in group])
+        X = np.concatenate(
+            (np.ones((len(group), n, 1)), np.transpose(Z[:, index], (1, 0, 2))), axis=2
+        )
+        coefficients = batched_lstsq(X, zy[:, np.newaxis])[:, :, 0]
+        zy_hat = np.einsum("mnk,mk->mn", X, coefficients)
+        r_squared, mmre, pred = calculate_regression_metrics(zy, zy_hat)
+        for i, subset in enumerate(group):
+            rows.append(
+                {
+                    "response": response,
+                    "predictors": " + ".join(subset),
+                    "n_predictors": size,
+                    "n": n,
+                    "r_squared": r_squared[i],
+                    "mmre": mmre[i],
+                    "pred": pred[i],
+                    "coefficients": tuple(coefficients[i]),
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+def search_models(
+    df: pd.DataFrame,
+    responses: Sequence[str] = RESPONSES,
+    predictors: Sequence[str] = PREDICTORS,
+    max_size: Optional[int] = None,
+    relative: bool = False,
+    sort_by: str = "r_squared",
+    workers: int = 1,
+) -> pd.DataFrame:
+    """
+    Fit every predictor combination against every response metric and return
+    a table ranked by `sort_by` within each response.
+
+    With `workers` > 1 the responses are fitted in a process pool.
+    """
+    args = [(df, r, predictors, max_size, relative) for r in responses]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            tables = list(executor.map(fit_response, *zip(*args)))
+    else:
+        tables = [fit_response(*a) for a in args]
+
+    results = pd.concat(tables, ignore_index=True)
+    ascending = sort_by == "mmre"
+    results = results.sort_values(
+        ["response", sort_by], ascending=[True, ascending], kind="stable"
+    )
+    results["rank"] = results.groupby("response").cumcount() + 1
+    return results.reset_index(drop=True)
+
+
+def main():
+    df = pd.read_csv(data_path("100.csv"))
+    results = search_models(df)
+    with pd.option_context("display.width", 120, "display.max_columns", None):
+        for response, table in results.groupby("response"):
+            print(f"\nBest models for {response}:")
+            print(
+                table.head(10)[
+                    ["rank", "predictors", "r_squared", "mmre", "pred"]
+                ].to_string(index=False)
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+from dataclasses import dataclass
+import numpy as np
+from typing import Tuple
+
+
+@dataclass(frozen=True)
+class Influence:
+    """Per-observation regression diagnostics."""
+
+    leverage: np.ndarray
+    studentized_residuals: np.ndarray
+    cooks_distance: np.ndarray
+
+
+def thin_qr(X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return the reduced QR factorization of the design matrix X.
+
+    Raises ValueError if X does not have full column rank.
+    """
+    Q, R = np.linalg.qr(X, mode="reduced")
+    diagonal = np.abs(np.diagonal(R))
+    tolerance = max(X.shape) * np.finfo(float).eps * max(diagonal.max(initial=0.0), 1.0)
+    if np.any(diagonal <= tolerance):
+        raise ValueError(
+            "Design matrix is rank deficient. Check for multicollinearity in predictors."
+        )
+    return Q, R
+
+
+class OLSSolver:
+    """
+    Ordinary least squares solver that factors the design matrix once.
+
+    X is factored as X = QR (thin QR) instead of forming inv(X.T @ X), which
+    squares the condition number. The factorization is reused for any number
+    of response columns and exposes the leverages and (X.T @ X)^-1 for the
+    interval code.
+    """
+
+    def __init__(
+        self, X: np.ndarray, intercept: bool = True, max_condition: float = 1e12
+    ):
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X[:, np.newaxis]
+        if intercept:
+            X = np.column_stack((np.ones(X.shape[0]), X))
+        self.X = X
+        self.Q, self.R = thin_qr(X)
+        self.condition = np.linalg.cond(self.R)
+        if self.condition > max_condition:
+            raise ValueError(
+                f"Design matrix is ill-conditioned (condition number {self.condition:.3g}). "
+                "Check for multicollinearity in predictors."
+            )
+        self._leverage = None
+
+    @property
+    def n(self) -> int:
+        return self.X.shape[0]
+
+    @property
+    def p(self) -> int:
+        return self.X.shape[1]
+
+    def solve(self, Y: np.ndarray) -> np.ndarray:
+        """
+        Return the coefficients for Y of shape (n,) or (n, k).
+
+        The result has shape (p,) or (p, k) respectively.
+        """
+        from scipy.linalg import solve_triangular
+
+        return solve_triangular(self.R, self.Q.T @ Y)
+
+    def predict(self, coefficients: np.ndarray) -> np.ndarray:
+        return self.X @ coefficients
+
+    def residuals(self, Y: np.ndarray) -> np.ndarray:
+        return Y - self.Q @ (self.Q.T @ Y)
+
+    def leverage(self) -> np.ndarray:
+        """Return diag(X @ inv(X.T @ X) @ X.T), the squared row norms of Q."""
+        if self._leverage is None:
+            self._leverage = np.einsum("ij,ij->i", self.Q, self.Q)
+        return self._leverage
+
+    def xtx_inv(self) -> np.ndarray:
+        """Return inv(X.T @ X) = inv(R) @ inv(R).T."""
+        from scipy.linalg import solve_triangular
+
+        R_inv = solve_triangular(self.R, np.eye(self.p))
+        return R_inv @ R_inv.T
+
+    def influence(self, y: np.ndarray) -> Influence:
+        """
+        Calculate leverages, internally studentized residuals and Cook's
+        distance of the fit of y.
+        """
+        n, p = self.n, self.p
+        leverage = self.leverage()
+        residuals = self.residuals(y)
+        mse = np.sum(residuals**2) / (n - p)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            studentized = residuals / np.sqrt(mse * (1 - leverage))
+            cooks = studentized**2 * leverage / (p * (1 - leverage))
+
+        return Influence(
+            leverage=leverage,
+            studentized_residuals=studentized,
+            cooks_distance=cooks,
+        )
+
+
+def hat_diagonal(X: np.ndarray) -> np.ndarray:
+    """
+    Return the leverages diag(X @ inv(X.T @ X) @ X.T) in O(n * p**2).
+
+    The diagonal of the hat matrix equals the squared row norms of Q in the
+    thin QR factorization X = QR, so the n x n matrix is never formed.
+    """
+    return OLSSolver(X, intercept=False, max_condition=np.inf).leverage()
+
+
+def influence(X: np.ndarray, y: np.ndarray) -> Influence:
+    """
+    Calculate leverages, internally studentized residuals and Cook's distance
+    of the least squares fit of y on X from a single QR factorization.
+
+    X must already contain the intercept column.
+    """
+    return OLSSolver(X, intercept=False, max_condition=np.inf).influence(y)
+
+
+def batched_lstsq(X: np.ndarray, Y: np.ndarray) -> np.ndarray:
+    """
+    Solve a stack of least squares problems X[i] @ B[i] ~ Y[i] at once.
+
+    X has shape (m, n, p) and Y has shape (m, n, k) or (n, k) when all
+    problems share the response. Returns B of shape (m, p, k). Problems whose
+    design matrix is rank deficient get NaN coefficients instead of failing
+    the whole batch.
+    """
+    Q, R = np.linalg.qr(X, mode="reduced")
+    QtY = np.swapaxes(Q, -1, -2) @ Y
+    diagonal = np.abs(np.diagonal(R, axis1=-2, axis2=-1))
+    tolerance = max(X.shape[-2:]) * np.finfo(float).eps * np.maximum(
+        diagonal.max(axis=-1, initial=0.0), 1.0
+    )
+    singular = np.any(diagonal <= tolerance[..., np.newaxis], axis=-1)
+    if np.any(singular):
+        R = R.copy()
+        R[singular] = np.eye(R.shape[-1])
+    B = np.linalg.solve(R, QtY)
+    B[singular] = np.nan
+    return B
@@ -0,0 +1,152 @@
+import csv
+import os
+import time
+import numpy as np
+from typing import Iterable, Iterator, Optional, Tuple
+
+# CSV columns of the predictors and the response, in model order
+PREDICTOR_COLUMNS = ("CBO", "WMC")
+RESPONSE_COLUMN = "RFC"
+
+
+class OnlineRegression:
+    """
+    Least squares fit of zy on [1, z] that is updated one row at a time.
+
+    Only the cross-product matrix of [1, z, zy] is stored, so each update is
+    O(p**2) and memory does not grow with the number of rows. Values are
+    shifted by the first observation to avoid cancellation in the sums of
+    squares.
+    """
+
+    def __init__(self, n_features: int = 2):
+        self.n_features = n_features
+        self.gram = np.zeros((n_features + 2, n_features + 2))
+        self.shift: Optional[np.ndarray] = None
+
+    @property
+    def n(self) -> int:
+        return int(self.gram[0, 0])
+
+    def update(self, z: np.ndarray, zy: float) -> None:
+        """Add a single observation."""
+        self.update_many(np.atleast_2d(z), np.atleast_1d(zy))
+
+    def update_many(self, Z: np.ndarray, zy: np.ndarray) -> None:
+        """Add a block of observations in O(k * p**2)."""
+        values = np.column_stack((Z, zy))
+        if values.shape[0] == 0:
+            return
+        if self.shift is None:
+            self.shift = values[0].copy()
+        A = np.column_stack((np.ones(values.shape[0]), values - self.shift))
+        self.gram += A.T @ A
+
+    def coefficients(self) -> np.ndarray:
+        """Return [b0, b1, ..., bp] of the current fit."""
+        if self.n <= self.n_features:
+            raise ValueError("Not enough observations to fit the model.")
+        try:
+            b = np.linalg.solve(self.gram[:-1, :-1], self.gram[:-1, -1])
+        except np.linalg.LinAlgError:
+            raise ValueError(
+                "Matrix inversion failed during regression coefficient calculation."
+            )
+        # undo the shift: zy - cy = b0' + b . (z - cz)
+        b[0] += self.shift[-1] - b[1:] @ self.shift[:-1]
+        return b
+
+    def residual_sum_of_squares(self) -> float:
+        b = np.linalg.solve(self.gram[:-1, :-1], self.gram[:-1, -1])
+        return max(self.gram[-1, -1] - b @ self.gram[:-1, -1], 0.0)
+
+    def epsilon_std(self) -> float:
+        """Standard deviation of epsilon, as in model.calculate_epsilon_std."""
+        return np.sqrt(self.residual_sum_of_squares() / (self.n - (self.n_features + 1)))
+
+    def r_squared(self) -> float:
+        """Coefficient of determination of the fit in log scale."""
+        total = self.gram[-1, -1] - self.gram[0, -1] ** 2 / self.n
+        return 1 - self.residual_sum_of_squares() / total
+
+
+def normalize_rows(
+    rows: np.ndarray, relative: bool = True
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Log-transform an (n, p + 2) block of [predictors..., response, NOC] rows.
+
+    Rows with non-positive values are dropped. Returns (Z, zy).
+    """
+    values = rows[:, :-1]
+    if relative:
+        values = values / rows[:, -1:]
+    values = values[np.all(values > 0, axis=1)]
+    values = np.log10(values)
+    return values[:, :-1], values[:, -1]
+
+
+def read_chunks(
+    path: str, chunk_size: int = 10000, follow: bool = False, poll_interval: float = 1.0
+) -> Iterator[np.ndarray]:
+    """
+    Yield blocks of [predictors..., response, NOC] rows from a metrics CSV.
+
+    With `follow` set the generator keeps waiting for rows appended to the
+    file, like `tail -f`, and yields partial blocks whenever it catches up.
+    """
+    columns = PREDICTOR_COLUMNS + (RESPONSE_COLUMN, "NOC")
+    with open(path, newline="") as file:
+        header = next(csv.reader([file.readline()]))
+        positions = [header.index(c) for c in columns]
+        block = []
+        pending = ""
+        while True:
+            line = file.readline()
+            if not line or not line.endswith("\n"):
+                # end of file or a row that is still being written
+                pending += line
+                if block:
+                    yield np.array(block, dtype=float)
+                    block = []
+                if not follow:
+                    if pending.strip():
+                        row = next(csv.reader([pending]))
+                        yield np.array([[row[i] for i in positions]], dtype=float)
+                    return
+                time.sleep(poll_interval)
+                continue
+            line, pending = pending + line, ""
+            if not line.strip():
+                continue
+            row = next(csv.reader([line]))
+            block.append([row[i] for i in positions])
+            if len(block) >= chunk_size:
+                yield np.array(block, dtype=float)
+                block = []
+
+
+def stream_regression(
+    chunks: Iterable[np.ndarray], relative: bool = True
+) -> Iterator[OnlineRegression]:
+    """Fold row blocks into an OnlineRegression, yielding it after each block."""
+    model = OnlineRegression(n_features=len(PREDICTOR_COLUMNS))
+    for chunk in chunks:
+        Z, zy = normalize_rows(chunk, relative)
+        model.update_many(Z, zy)
+        yield model
+
+
+def main():
+    path = os.path.join(os.path.dirname(__file__), "..", "assets", "dataset.csv")
+    for model in stream_regression(read_chunks(path, chunk_size=25)):
+        if model.n > len(PREDICTOR_COLUMNS) + 1:
+            b0, b1, b2 = model.coefficients()
+            print(
+                f"n = {model.n}: b0 = {b0:.4f}, b1 = {b1:.4f}, b2 = {b2:.4f}, "
+                f"epsilon std = {model.epsilon_std():.4f}, R^2 = {model.r_squared():.4f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,29 @@
-from dataclasses import dataclass
-import pandas as pd
 import numpy as np
 import os
-from typing import List, Tuple
-from scipy.stats import f, t, chi2, norm
-import random
-import pingouin as pg
+import time
+from typing import List, Optional, Tuple
+from project_table import ProjectTable
+from dataset_cache import load_table
+from transforms import ColumnTransforms, Log10Transform, column_transform
+from ols import OLSSolver, hat_diagonal
+from incremental import IncrementalFit, IterationStats
+from quantiles import critical_value
+from instrument import enabled as instrumentation_enabled, instrumented, stage
+from mcd import fast_mcd
+from mahalanobis import (
+    cholesky_factor,
+    covariance_factor,
+    factor_inverse,
+    squared_distances,
+    test_statistic as f_statistic,
+)
+from splits import extreme_indices, quantile_strata, split_indices
 
 alpha = 0.005
-
-@dataclass(frozen=True)
-class Project:
-    url: str
-    x1: float
-    x2: float
-    y: float
-    zx1: float = 0.0
-    zx2: float = 0.0
-    zy: float = 0.0
-    ts: float = 0.0
+# rows processed at once when accumulating Mardia's moments
+mardia_block_size = 4096
+# log10 that maps non-positive metrics to 0
+LOG10_POSITIVE = Log10Transform(invalid="zero")
 
 
 def data_path(filename: str) -> str:
@@ -26,22 +31,82 @@ def data_path(filename: str) -> str:
     return os.path.join(os.path.dirname(__file__), "data", filename)
 
 
-def retrieve_data(filename: str = "100.csv") -> List[Project]:
-    """Load data from CSV file and return a list of Project objects."""
-    df = pd.read_csv(data_path(filename))
-    projects = [
-        Project(
-            url=row["URL"],
-            x1=row["CBO"] / row["NOC"],
-            x2=row["WMC"] / row["NOC"],
-            y=row["RFC"] / row["NOC"],
-        )
-        for _, row in df.iterrows()
-    ]
-    return projects
+@instrumented("load")
+def retrieve_data(
+    filename: str = "100.csv", normalized: bool = False, use_cache: bool = True
+) -> ProjectTable:
+    """
+    Load data from CSV file into a ProjectTable of metrics relative to NOC.
+
+    With `use_cache` the columns (and the z-columns if `normalized` is set) are
+    memory-mapped from the binary cache in dataset_cache.
+    """
+    transform = LOG10_POSITIVE if normalized else None
+    if use_cache:
+        return load_table(data_path(filename), relative=True, transform=transform)
+    projects = ProjectTable.from_csv(data_path(filename), relative=True)
+    return normalize_data(projects) if normalized else projects
+
+
+def mardia_partial_moments(
+    centered: np.ndarray, L: np.ndarray, block_size: int = mardia_block_size
+) -> Tuple[np.ndarray, float]:
+    """
+    Return the third-moment tensor sum_i u_i (x) u_i (x) u_i and sum_i |u_i|**4
+    of the whitened rows u_i = L.T @ c_i.
+
+    Both are sums over rows, so partial results of separate chunks of the
+    same dataset can simply be added (see mardia_moments).
+    """
+    p = centered.shape[1]
+    third_moment = np.zeros((p, p, p))
+    trace_squared = 0.0
+    for start in range(0, centered.shape[0], block_size):
+        U = centered[start:start + block_size] @ L
+        third_moment += np.einsum("ni,nj,nk->ijk", U, U, U, optimize=True)
+        trace_squared += np.sum(np.sum(U * U, axis=1) ** 2)
+    return third_moment, float(trace_squared)
+
+
+def mardia_moments(
+    centered: np.ndarray, S_inv: np.ndarray, block_size: int = mardia_block_size
+) -> Tuple[float, float]:
+    """
+    Accumulate sum(D**3) and trace(D**2) for D = centered @ S_inv @ centered.T
+    without materializing the N x N matrix D.
+
+    With S_inv = L @ L.T and u_i = L.T @ c_i we have D_ij = u_i . u_j, so
+    sum(D**3) is the squared norm of the third-moment tensor sum_i u_i (x) u_i (x) u_i.
+    Both sums are built from row blocks of `block_size`, which keeps memory at
+    O(block_size * p**2) and time at O(N * p**3). If S_inv is not positive
+    definite, D is evaluated in (block_size x N) tiles instead.
+    """
+    if block_size < 1:
+        raise ValueError("block_size must be a positive integer")
+    n, p = centered.shape
+    try:
+        L = np.linalg.cholesky(S_inv)
+    except np.linalg.LinAlgError:
+        L = None
+
+    sum_cubed = 0.0
+    trace_squared = 0.0
+    if L is not None:
+        third_moment, trace_squared = mardia_partial_moments(centered, L, block_size)
+        sum_cubed = np.sum(third_moment**2)
+    else:
+        right = S_inv @ centered.T
+        for start in range(0, n, block_size):
+            D = centered[start:start + block_size] @ right
+            sum_cubed += np.sum(D**3)
+            trace_squared += np.sum(np.diagonal(D, offset=start) ** 2)
+    return float(sum_cubed), float(trace_squared)
 
 
-def mardia_test(data: np.ndarray, cov: bool = True) -> Tuple[float, float, float, float]:
+@instrumented("mardia")
+def mardia_test(
+    data: np.ndarray, cov: bool = True, block_size: int = mardia_block_size
+) -> Tuple[float, float, float, float]:
     """
     https://rdrr.io/cran/MVN/src/R/mvn.R
     https://stats.stackexchange.com/questions/317147/how-to-get-a-single-p-value-from-the-two-p-values-of-a-mardias-multinormality-t
@@ -58,6 +123,7 @@ def mardia_test(data: np.ndarray, cov: bool = True) -> Tuple[float, float, float
      Inputs:
           X - multivariate data matrix [Size of matrix must be n(data)-by-p(variables)].
           cov - boolean to whether to normalize the covariance matrix by n (c=1[default]) or by n-1 (c~=1)
+          block_size - number of rows streamed at once (see mardia_moments)
 
      Outputs:
           - skewness test statistic
@@ -65,6 +131,8 @@ def mardia_test(data: np.ndarray, cov: bool = True) -> Tuple[float, float, float
           - significance value for skewness
           - significance value for kurtosis
     """
+    from scipy.stats import chi2, norm
+
     n, p = data.shape
 
     # correct for small sample size
@@ -84,12 +152,12 @@ def mardia_test(data: np.ndarray, cov: bool = True) -> Tuple[float, float, float
         # print for now
         print(e)
         return 0.0, 0.0, 0.0, 0.0
-    # squared-Mahalanobis' distances matrix
-    D: np.ndarray = (data - data_mean) @ iS @ (data - data_mean).T
+    # sums over the squared-Mahalanobis' distances matrix, streamed in blocks
+    sum_cubed, trace_squared = mardia_moments(data - data_mean, iS, block_size)
     # multivariate skewness coefficient
-    g1p: float = np.sum(D**3)/n**2
+    g1p: float = sum_cubed/n**2
     # multivariate kurtosis coefficient
-    g2p: float = np.trace(D**2)/n
+    g2p: float = trace_squared/n
     # small sample correction
     k: float = ((p + 1)*(n + 1)*(n + 3))/(n*(((n + 1)*(p + 1)) - 6))
     # degrees of freedom
@@ -112,12 +180,13 @@ def mardia_test(data: np.ndarray, cov: bool = True) -> Tuple[float, float, float
 
     return g_skew, g_kurt, p_skew, p_kurt
 
-def mardia_skewness_kurtosis(X):
+def mardia_skewness_kurtosis(X, block_size=mardia_block_size):
     """
     Calculate Mardia's multivariate skewness and kurtosis for the dataset X.
     
     Parameters:
         X (np.ndarray): A 2D numpy array where each row represents an observation and each column represents a variable.
+        block_size (int): Number of rows streamed at once (see mardia_moments).
     
     Returns:
         tuple: (beta_1_k, beta_2_k) where beta_1_k is the multivariate skewness and beta_2_k is the multivariate kurtosis.
@@ -132,37 +201,42 @@ def mardia_skewness_kurtosis(X):
     # Center the data
     centered_data = X - mean_vector
     
+    skewness_sum, kurtosis_sum = mardia_moments(centered_data, S_inv, block_size)
+
     # Calculate multivariate skewness (beta_1_k)
-    skewness_sum = 0
-    for i in range(N):
-        for j in range(N):
-            skewness_sum += (centered_data[i].T @ S_inv @ centered_data[j]) ** 3
     beta_1_k = skewness_sum / (N ** 2)
     
     # Calculate multivariate kurtosis (beta_2_k)
-    mahalanobis_distances = np.array([centered_data[i].T @ S_inv @ centered_data[i] for i in range(N)])
-    beta_2_k = np.mean(mahalanobis_distances ** 2)
+    beta_2_k = kurtosis_sum / N
     
     return beta_1_k, beta_2_k
 
-def mardia_tests(X):
+@instrumented("mardia")
+def mardia_tests(X, block_size=mardia_block_size):
     """
     Perform Mardia's test for multivariate skewness and kurtosis.
     
     Parameters:
         X (np.ndarray): A 2D numpy array where each row represents an observation and each column represents a variable.
         alpha (float): Significance level for the hypothesis test (default is 0.005).
+        block_size (int): Number of rows streamed at once (see mardia_moments).
     
     Returns:
         dict: Test results with keys 'skewness', 'kurtosis', 'normality' and the test statistics and p-values.
     """
     N, k = X.shape
-    beta_1_k, beta_2_k = mardia_skewness_kurtosis(X)
-    
+    beta_1_k, beta_2_k = mardia_skewness_kurtosis(X, block_size)
+    return mardia_result(N, k, beta_1_k, beta_2_k)
+
+
+def mardia_result(N: int, k: int, beta_1_k: float, beta_2_k: float) -> dict:
+    """Build the mardia_tests result from the skewness and kurtosis coefficients."""
+    from scipy.stats import chi2, norm
+
     # Test statistic for skewness
     skewness_stat = N / 6 * beta_1_k
     skewness_df = k * (k + 1) * (k + 2) / 6
-    skewness_critical_value = chi2.ppf(1 - alpha, df=skewness_df)
+    skewness_critical_value = critical_value("chi2", 1 - alpha, skewness_df)
     skewness_significant = skewness_stat > skewness_critical_value
     skewness_p_value = 1 - chi2.cdf(skewness_stat, df=skewness_df)
     
@@ -170,7 +244,7 @@ def mardia_tests(X):
     expected_kurtosis = k * (k + 2)
     kurtosis_variance = 8 * k * (k + 2) / N
     kurtosis_stat = beta_2_k
-    kurtosis_critical_value = norm.ppf(1 - alpha, loc=expected_kurtosis, scale=np.sqrt(kurtosis_variance))
+    kurtosis_critical_value = expected_kurtosis + np.sqrt(kurtosis_variance) * critical_value("norm", 1 - alpha)
     kurtosis_significant = kurtosis_stat > kurtosis_critical_value
     kurtosis_p_value = 1 - norm.cdf(kurtosis_stat, loc=expected_kurtosis, scale=np.sqrt(kurtosis_variance))
     
@@ -195,8 +269,8 @@ def perform_mardia_test(data: np.ndarray):
     print(f"Skewness: {g_skew:.4f} (p-value: {p_skew:.4f})")
     print(f"Kurtosis: {g_kurt:.4f} (p-value: {p_kurt:.4f})")
     p = data.shape[1]
-    skewn_crit = chi2.ppf(1 - alpha, p * (p + 1) * (p + 2) / 6)
-    kurt_crit = norm.ppf(1 - alpha)
+    skewn_crit = critical_value("chi2", 1 - alpha, p * (p + 1) * (p + 2) / 6)
+    kurt_crit = critical_value("norm", 1 - alpha)
     print(f"Skewness critical value: {skewn_crit:.4f}")
     print(f"Kurtosis critical value: {kurt_crit:.4f}")
     
@@ -208,94 +282,94 @@ def perform_mardia_test(data: np.ndarray):
     print(mardia_tests(data))
 
 
-def normalize_data(projects: List[Project]) -> List[Project]:
-    """Normalize the data using logarithmic scaling."""
-    normalized_projects = []
-    for project in projects:
-        try:
-            zx1 = np.log10(project.x1) if project.x1 > 0 else 0.0
-            zx2 = np.log10(project.x2) if project.x2 > 0 else 0.0
-            zy = np.log10(project.y) if project.y > 0 else 0.0
-        except ValueError:
-            zx1, zx2, zy = 0.0, 0.0, 0.0
-
-        normalized_projects.append(
-            Project(
-                url=project.url,
-                x1=project.x1,
-                x2=project.x2,
-                y=project.y,
-                zx1=zx1,
-                zx2=zx2,
-                zy=zy,
-            )
-        )
-    return normalized_projects
+@instrumented("normalize")
+def normalize_data(
+    projects: ProjectTable, transform: ColumnTransforms = LOG10_POSITIVE
+) -> ProjectTable:
+    """
+    Normalize the data using logarithmic scaling.
+
+    Non-positive values are mapped to 0. Another transform, or a mapping of
+    "x1", "x2" and "y" to transforms, may be passed instead.
+    """
+    return projects.with_columns(
+        zx1=column_transform(transform, "x1").forward(projects.x1),
+        zx2=column_transform(transform, "x2").forward(projects.x2),
+        zy=column_transform(transform, "y").forward(projects.y),
+    )
 
 
-def projects_to_array(projects: List[Project]) -> np.ndarray:
-    """Convert a list of Project objects to a numpy array."""
-    return np.array([[p.zx1, p.zx2, p.zy] for p in projects])
+def projects_to_array(projects: ProjectTable) -> np.ndarray:
+    """Stack the normalized columns of a ProjectTable into an (n, 3) array."""
+    return np.column_stack((projects.zx1, projects.zx2, projects.zy))
 
 
 def calculate_cov_inv(Z: np.ndarray) -> np.ndarray:
-    """Calculate the inverse of the covariance matrix."""
-    try:
-        Z_centered = Z - np.mean(Z, axis=0)
-        cov = np.cov(Z_centered, rowvar=False)
-        return np.linalg.inv(cov)
-    except np.linalg.LinAlgError:
-        raise ValueError("Covariance matrix is singular and cannot be inverted.")
+    """Calculate the inverse of the covariance matrix from its Cholesky factor."""
+    _, L = covariance_factor(Z)
+    return factor_inverse(L)
 
 
-def calculate_mahalanobis_distances(Z: np.ndarray, cov_inv: np.ndarray) -> np.ndarray:
-    """Calculate Mahalanobis distances."""
-    Z_centered = Z - np.mean(Z, axis=0)
-    left = np.dot(Z_centered, cov_inv)
-    mahalanobis = np.sqrt(np.sum(left * Z_centered, axis=1))
-    return mahalanobis
+def calculate_mahalanobis_distances(
+    Z: np.ndarray, L: np.ndarray, mean: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Calculate Mahalanobis distances from the lower Cholesky factor L of the
+    covariance, with triangular solves instead of its inverse.
+    """
+    if mean is None:
+        mean = np.mean(Z, axis=0)
+    return np.sqrt(squared_distances(Z, mean, L))
 
 
-def calculate_test_statistic(n: int, mahalanobis_distances: np.ndarray) -> np.ndarray:
-    """Calculate the test statistic based on Mahalanobis distances."""
-    return ((n - 3) * n / ((n**2 - 1) * 3)) * mahalanobis_distances**2
+def calculate_test_statistic(
+    n: int, mahalanobis_distances: np.ndarray, p: int = 3
+) -> np.ndarray:
+    """Calculate the F(p, n - p) test statistic of p-dimensional Mahalanobis distances."""
+    return f_statistic(n, p, mahalanobis_distances**2)
 
 
+@instrumented("mahalanobis")
 def determine_outliers_mahalanobis(
-    projects: List[Project]
-) -> Tuple[List[int], List[Project]]:
-    """Determine outliers using Mahalanobis distance."""
+    projects: ProjectTable,
+    fit: Optional[IncrementalFit] = None,
+    robust: bool = False,
+    seed: Optional[int] = None,
+    workers: int = 1,
+) -> Tuple[List[int], ProjectTable]:
+    """
+    Determine outliers using Mahalanobis distance.
+
+    If `fit` is given, `projects` must hold its remaining rows and the mean and
+    covariance are read from its statistics instead of recomputed.
+    If `robust` is True the distances use the FAST-MCD location and scatter,
+    which the outliers themselves cannot distort.
+    """
     Z = projects_to_array(projects)
-    n = Z.shape[0]
-    cov_inv = calculate_cov_inv(Z)
-    mahalanobis_distances = calculate_mahalanobis_distances(Z, cov_inv)
-    test_statistic = calculate_test_statistic(n, mahalanobis_distances)
+    n, p = Z.shape
+    if robust:
+        estimate = fast_mcd(Z, seed=seed, workers=workers)
+        mean, L = estimate.location, cholesky_factor(estimate.covariance)
+    elif fit is None:
+        mean, L = covariance_factor(Z)
+    else:
+        mean, L = fit.mean(), cholesky_factor(fit.covariance())
+    mahalanobis_distances = calculate_mahalanobis_distances(Z, L, mean)
+    test_statistic = calculate_test_statistic(n, mahalanobis_distances, p)
 
-    fisher_f = f.ppf(1 - alpha, 3, n - 3)
+    fisher_f = critical_value("f", 1 - alpha, p, n - p)
     print(f"Fisher F value for {n} projects = {fisher_f:.4f}")
 
     outliers = np.where(test_statistic > fisher_f)[0].tolist()
 
-    projects_with_ts = []
-    for i, p in enumerate(projects):
-        projects_with_ts.append(
-            Project(
-                url=p.url,
-                x1=p.x1,
-                x2=p.x2,
-                y=p.y,
-                zx1=p.zx1,
-                zx2=p.zx2,
-                zy=p.zy,
-                ts=test_statistic[i],
-            )
-        )
+    projects_with_ts = projects.with_columns(ts=test_statistic)
 
     return outliers, projects_with_ts
 
 
+@instrumented("intervals")
 def calculate_prediction_interval(
-    Z: np.ndarray, Y_hat: np.ndarray
+    Z: np.ndarray, Y_hat: np.ndarray, leverage: Optional[np.ndarray] = None
 ) -> Tuple[np.ndarray, np.ndarray]:
     """Calculate prediction interval for each data point."""
     X = np.column_stack((np.ones(Z.shape[0]), Z[:, :-1]))
@@ -304,10 +378,11 @@ def calculate_prediction_interval(
     residuals = Z[:, -1] - Y_hat
     mse = np.sum(residuals**2) / (n - p)
 
-    leverage = np.diagonal(X @ np.linalg.inv(X.T @ X) @ X.T)
+    if leverage is None:
+        leverage = hat_diagonal(X)
     se = np.sqrt(mse * (1 + leverage))
 
-    t_value = t.ppf(1 - alpha / 2, n - p)
+    t_value = critical_value("t", 1 - alpha / 2, n - p)
     margin = t_value * se
 
     lower_bound = Y_hat - margin
@@ -329,28 +404,40 @@ def calculate_regression_coefficients(
     Z: np.ndarray,
 ) -> Tuple[float, float, float, float]:
     """Calculate regression coefficients using Ordinary Least Squares."""
-    X = Z[:, :-1]
-    Y = Z[:, -1]
-    X = np.column_stack((np.ones(X.shape[0]), X))
-    try:
-        coefficients = np.linalg.inv(X.T @ X) @ X.T @ Y
-    except np.linalg.LinAlgError:
-        raise ValueError(
-            "Matrix inversion failed during regression coefficient calculation."
-        )
-    return tuple(coefficients)
+    return tuple(OLSSolver(Z[:, :-1]).solve(Z[:, -1]))
 
 
-def remove_outliers(projects: List[Project]) -> List[Project]:
-    """Remove outliers"""
-    outliers_mahalanobis, ts_projects = determine_outliers_mahalanobis(projects)
+def find_outliers(
+    projects: ProjectTable,
+    fit: Optional[IncrementalFit] = None,
+    robust: bool = False,
+    seed: Optional[int] = None,
+    workers: int = 1,
+) -> List[int]:
+    """
+    Return the positions of Mahalanobis and prediction interval outliers.
+
+    If `fit` is given, `projects` must hold its remaining rows and the
+    regression is read from its statistics instead of refitted. `robust`,
+    `seed` and `workers` are passed to determine_outliers_mahalanobis.
+    """
+    outliers_mahalanobis, ts_projects = determine_outliers_mahalanobis(
+        projects, fit, robust, seed, workers
+    )
     for i in outliers_mahalanobis:
         print(
             f"Removed {projects[i].url} project as mahalanobis outlier: zy: {projects[i].zy:.4f} zx1: {projects[i].zx1:.4f} zx2: {projects[i].zx2:.4f} (TS: {ts_projects[i].ts:.4f})"
         )
     # Get the data array for prediction intervals
     Z = projects_to_array(projects)
-    b0, b1, b2 = calculate_regression_coefficients(Z)
+    with stage("ols", rows=Z.shape[0]):
+        if fit is None:
+            solver = OLSSolver(Z[:, :-1])
+            b0, b1, b2 = solver.solve(Z[:, -1])
+            leverage = solver.leverage()
+        else:
+            b0, b1, b2 = fit.coefficients()
+            leverage = fit.leverage(np.column_stack((np.ones(Z.shape[0]), Z[:, :-1])))
 
     # Calculate predicted values without noise first
     Y_hat_initial = b0 + b1 * Z[:, 0] + b2 * Z[:, 1]
@@ -361,7 +448,7 @@ def remove_outliers(projects: List[Project]) -> List[Project]:
     # Calculate final predicted values including residuals
     Y_hat = Y_hat_initial + epsilon
 
-    lower_bound, upper_bound = calculate_prediction_interval(Z, Y_hat)
+    lower_bound, upper_bound = calculate_prediction_interval(Z, Y_hat, leverage)
 
     # Get outliers using prediction intervals
     outliers_intervals = identify_outliers_intervals(Z, lower_bound, upper_bound)
@@ -371,92 +458,114 @@ def remove_outliers(projects: List[Project]) -> List[Project]:
         )
 
     # Combine both sets of outliers
-    all_outliers = set(outliers_mahalanobis + outliers_intervals)
+    return sorted(set(outliers_mahalanobis + outliers_intervals))
 
-    # Return projects with outliers removed
-    return [p for i, p in enumerate(projects) if i not in all_outliers]
 
+def remove_outliers(projects: ProjectTable) -> ProjectTable:
+    """Remove outliers"""
+    keep = np.ones(len(projects), dtype=bool)
+    keep[find_outliers(projects)] = False
+    return projects.take(keep)
 
-def iterative_outlier_removal(projects: List[Project]) -> List[Project]:
-    """Iteratively remove outliers until no more outliers are found."""
+
+def iterative_outlier_removal(
+    projects: ProjectTable, stats: Optional[List[IterationStats]] = None
+) -> ProjectTable:
+    """
+    Iteratively remove outliers until no more outliers are found.
+
+    The mean, covariance and regression fit are kept as sufficient statistics
+    in an IncrementalFit, so each round only downdates them by the removed
+    rows instead of refitting from scratch. If a `stats` list is given, an
+    IterationStats with the rows, removals and time of every round is
+    appended to it.
+    """
+    fit = IncrementalFit(projects_to_array(projects))
     iteration = 1
     while True:
         print(f"\nStarting iteration {iteration}")
-        new_projects = remove_outliers(projects)
+        start = time.perf_counter()
+        rows = fit.n
+        with stage("iteration", rows=rows, iteration=iteration):
+            outliers = find_outliers(projects.take(fit.active), fit)
+        fit.remove(outliers)
+        iteration_stats = IterationStats(
+            iteration=iteration,
+            rows=rows,
+            removed=len(outliers),
+            seconds=time.perf_counter() - start,
+        )
+        if stats is not None:
+            stats.append(iteration_stats)
+        if not instrumentation_enabled():
+            # the "iteration" stage records replace this line when instrumenting
+            print(
+                f"Iteration {iteration}: removed {iteration_stats.removed} of {rows} projects in {iteration_stats.seconds:.4f}s"
+            )
 
-        if len(new_projects) == len(projects):
+        if not outliers:
             print("No more outliers found. Stopping iterations.")
             break
 
-        projects = new_projects
         iteration += 1
 
-    return projects
+    return projects.take(fit.active)
 
 
-def split_data(
-    projects: List[Project], train_ratio: float = 0.6
-) -> Tuple[List[Project], List[Project]]:
+def robust_outlier_removal(
+    projects: ProjectTable, seed: Optional[int] = None, workers: int = 1
+) -> ProjectTable:
     """
-    Split the data into training and testing sets, ensuring that the training set
-    includes the min and max values for each metric, and the testing set covers the remaining range.
-    """
-    # Sort projects by each metric
-    sorted_by_x1 = sorted(projects, key=lambda p: p.x1)
-    sorted_by_x2 = sorted(projects, key=lambda p: p.x2)
-    sorted_by_y = sorted(projects, key=lambda p: p.y)
-
-    # Get min and max projects for each metric
-    min_max_projects = {
-        sorted_by_x1[0],
-        sorted_by_x1[-1],
-        sorted_by_x2[0],
-        sorted_by_x2[-1],
-        sorted_by_y[0],
-        sorted_by_y[-1],
-    }
+    Remove outliers in a single pass using robust (MCD) Mahalanobis distances.
 
-    # Remove min and max projects from the main list
-    remaining_projects = [p for p in projects if p not in min_max_projects]
-
-    # Shuffle the remaining projects
-    random.shuffle(remaining_projects)
+    Because the robust estimate is not pulled towards the outliers, one pass
+    flags what iterative_outlier_removal finds over several rounds.
+    """
+    keep = np.ones(len(projects), dtype=bool)
+    keep[find_outliers(projects, robust=True, seed=seed, workers=workers)] = False
+    return projects.take(keep)
 
-    # Calculate the number of additional projects needed for the training set
-    n_train = max(int(len(projects) * train_ratio) - len(min_max_projects), 0)
 
-    # Split the remaining projects
-    train_projects = list(min_max_projects) + remaining_projects[:n_train]
-    test_projects = remaining_projects[n_train:]
+@instrumented("split")
+def split_data(
+    projects: ProjectTable,
+    train_ratio: float = 0.6,
+    stratify: Optional[int] = None,
+    rng: Optional[np.random.Generator] = None,
+) -> Tuple[ProjectTable, ProjectTable]:
+    """
+    Split the data into training and testing sets, ensuring that the training set
+    includes the min and max values for each metric, and the testing set covers the remaining range.
 
-    return train_projects, test_projects
+    With `stratify` the remaining projects are drawn from that many y-quantile
+    bins in proportion to their size. Pass a seeded `rng` for a reproducible split.
+    """
+    strata = quantile_strata(projects.y, stratify) if stratify else None
+    train, test = split_indices(
+        len(projects),
+        train_ratio,
+        rng=rng,
+        always_train=extreme_indices(projects.x1, projects.x2, projects.y),
+        strata=strata,
+    )
+    return projects.take(train[0]), projects.take(test[0])
 
 
-def save_to_csv(projects: List[Project], filename: str):
-    """Save the list of projects to a CSV file."""
-    df = pd.DataFrame(
-        [
-            {
-                "URL": p.url,
-                "RFC": p.y,
-                "CBO": p.x1,
-                "WMC": p.x2,
-            }
-            for p in projects
-        ]
-    )
+def save_to_csv(projects: ProjectTable, filename: str):
+    """Save the projects to a CSV file."""
     path = data_path(filename)
-    df.to_csv(path, index=False)
+    projects.to_frame().to_csv(path, index=False)
 
 
 def main():
-    projects = retrieve_data('george.csv')
-    data = np.array([[p.x1, p.x2, p.y] for p in projects])
+    normalized_projects = retrieve_data('george.csv', normalized=True)
+    data = np.column_stack(
+        (normalized_projects.x1, normalized_projects.x2, normalized_projects.y)
+    )
     perform_mardia_test(data)
 
-    print(f"Initial number of data points: {len(projects)}")
+    print(f"Initial number of data points: {len(normalized_projects)}")
 
-    normalized_projects = normalize_data(projects)
     print(mardia_tests(projects_to_array(normalized_projects)))
     final_projects = iterative_outlier_removal(normalized_projects)
 
@@ -0,0 +1,304 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import time
+from dataclasses import dataclass, replace
+import numpy as np
+from typing import Any, Callable, Dict, Optional, Tuple
+from dataset_cache import file_digest
+from project_table import ProjectTable
+from transforms import ColumnTransforms, column_transform, transform_spec
+
+cache_dir = os.path.join(os.path.dirname(__file__), "data", ".cache", "pipeline")
+# least recently used results are evicted beyond this size
+max_cache_bytes = 512 * 2**20
+# bump when a stage's output format or semantics change
+PIPELINE_VERSION = 2
+
+
+class StageCache:
+    """
+    Size-bounded on-disk store of pickled stage results keyed by content hash.
+
+    A file's mtime is its last use: hits touch it, and `evict` removes the
+    oldest files until the total size fits in `max_bytes`.
+    """
+
+    def __init__(self, directory: str = cache_dir, max_bytes: int = max_cache_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        path = self.path(key)
+        try:
+            with open(path, "rb") as file:
+                value = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self.misses += 1
+            return False, None
+        os.utime(path)
+        self.hits += 1
+        return True, value
+
+    def put(self, key: str, value: Any) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        descriptor, staging = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(descriptor, "wb") as file:
+            pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(staging, self.path(key))
+        self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pkl"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def clear(self) -> None:
+        for entry in os.scandir(self.directory) if os.path.isdir(self.directory) else ():
+            if entry.name.endswith((".pkl", ".tmp")):
+                os.remove(entry.path)
+
+
+@dataclass(frozen=True)
+class Stage:
+    """A pipeline step: its upstream stages, the parameters in its key and how to run it."""
+
+    name: str
+    inputs: Tuple[str, ...]
+    parameters: Callable[["Pipeline"], Dict[str, Any]]
+    run: Callable[..., Any]
+
+
+def _load(pipeline: "Pipeline") -> ProjectTable:
+    return ProjectTable.from_csv(pipeline.path, relative=pipeline.relative)
+
+
+def _normalize(pipeline: "Pipeline", projects: ProjectTable) -> ProjectTable:
+    from outliers import normalize_data
+
+    return normalize_data(projects, pipeline.transform)
+
+
+def _mardia(pipeline: "Pipeline", projects: ProjectTable) -> dict:
+    from outliers import mardia_tests, projects_to_array
+
+    return mardia_tests(projects_to_array(projects))
+
+
+def _outliers(pipeline: "Pipeline", projects: ProjectTable) -> ProjectTable:
+    from outliers import iterative_outlier_removal, robust_outlier_removal
+
+    if pipeline.robust:
+        return robust_outlier_removal(projects, seed=pipeline.seed)
+    return iterative_outlier_removal(projects)
+
+
+def _split(pipeline: "Pipeline", projects: ProjectTable) -> Tuple[ProjectTable, ProjectTable]:
+    from outliers import split_data
+
+    return split_data(
+        projects,
+        train_ratio=pipeline.train_ratio,
+        stratify=pipeline.stratify,
+        rng=np.random.default_rng(pipeline.seed),
+    )
+
+
+def _fit(pipeline: "Pipeline", split: Tuple[ProjectTable, ProjectTable]):
+    """Fit on the training z-columns, which the normalize stage made with `pipeline.transform`."""
+    from model import alpha, calculate_regression_metrics
+    from prediction import FittedModel
+
+    train, test = split
+    response = column_transform(pipeline.transform, "y")
+    fitted = FittedModel.fit(
+        np.column_stack((train.zx1, train.zx2)),
+        train.zy,
+        alpha=alpha,
+        transform=response,
+        predictor_transforms=tuple(column_transform(pipeline.transform, c) for c in ("x1", "x2")),
+        relative=pipeline.relative,
+    )
+    metrics = {}
+    for prefix, projects in (("", train), ("test_", test)):
+        zy_hat, _ = fitted.predict_transformed(np.column_stack((projects.zx1, projects.zx2)))
+        values = calculate_regression_metrics(projects.zy, zy_hat, response)
+        metrics.update(zip((f"{prefix}r_squared", f"{prefix}mmre", f"{prefix}pred"), map(float, values)))
+    return replace(fitted, metrics=metrics)
+
+
+def _intervals(pipeline: "Pipeline", fitted, split: Tuple[ProjectTable, ProjectTable]):
+    """Prediction and confidence intervals of the training and test projects, on the fitted scale."""
+    return {
+        name: fitted.predict(np.column_stack((projects.zx1, projects.zx2)))
+        for name, projects in zip(("train", "test"), split)
+    }
+
+
+def _outlier_parameters(pipeline: "Pipeline") -> Dict[str, Any]:
+    import outliers
+
+    parameters = {"alpha": outliers.alpha, "robust": pipeline.robust}
+    if pipeline.robust:
+        parameters["seed"] = pipeline.seed
+    return parameters
+
+
+def _fit_parameters(pipeline: "Pipeline") -> Dict[str, Any]:
+    import model
+
+    return {"alpha": model.alpha}
+
+
+STAGES = {
+    stage.name: stage
+    for stage in (
+        Stage("load", (), lambda p: {"file": file_digest(p.path), "relative": p.relative}, _load),
+        Stage("normalize", ("load",), lambda p: {"transform": transform_spec(p.transform)}, _normalize),
+        Stage("mardia", ("normalize",), lambda p: {}, _mardia),
+        Stage("outliers", ("normalize",), _outlier_parameters, _outliers),
+        Stage(
+            "split",
+            ("outliers",),
+            lambda p: {"train_ratio": p.train_ratio, "stratify": p.stratify, "seed": p.seed},
+            _split,
+        ),
+        Stage("fit", ("split",), _fit_parameters, _fit),
+        Stage("intervals", ("fit", "split"), lambda p: {}, _intervals),
+    )
+}
+
+
+class Pipeline:
+    """
+    The outlier-and-model analysis of one metrics CSV as a DAG of memoized stages.
+
+    A stage's key hashes its name, its parameters and the keys of its
+    inputs, and the load stage's key hashes the file contents, so a key
+    identifies a result by content. Changing a parameter therefore only
+    recomputes the stages that depend on it; e.g. a new train_ratio reruns
+    split, fit and intervals but reuses load, normalize, mardia and outliers.
+
+    As in outliers.py, metrics are divided by NOC unless `relative` is False,
+    and `transform` (LOG10_POSITIVE by default) gives the z-columns that the
+    outlier screening, the fit and the model's interval transforms all use.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        relative: bool = True,
+        transform: Optional[ColumnTransforms] = None,
+        train_ratio: float = 0.6,
+        stratify: Optional[int] = None,
+        seed: int = 0,
+        robust: bool = False,
+        cache: Optional[StageCache] = None,
+    ):
+        if transform is None:
+            from outliers import LOG10_POSITIVE
+
+            transform = LOG10_POSITIVE
+        self.path = path
+        self.relative = relative
+        self.transform = transform
+        self.train_ratio = train_ratio
+        self.stratify = stratify
+        self.seed = seed
+        self.robust = robust
+        self.cache = cache or StageCache()
+        self.keys: Dict[str, str] = {}
+        self.results: Dict[str, Any] = {}
+        self.log: Dict[str, Tuple[str, float]] = {}
+
+    def key(self, name: str) -> str:
+        if name not in self.keys:
+            stage = STAGES[name]
+            description = {
+                "version": PIPELINE_VERSION,
+                "stage": name,
+                "parameters": stage.parameters(self),
+                "inputs": [self.key(upstream) for upstream in stage.inputs],
+            }
+            self.keys[name] = hashlib.sha256(
+                json.dumps(description, sort_keys=True).encode()
+            ).hexdigest()[:32]
+        return self.keys[name]
+
+    def run(self, name: str) -> Any:
+        """Return the result of a stage, from the cache or by running it and its inputs."""
+        if name in self.results:
+            return self.results[name]
+        if name not in STAGES:
+            raise ValueError(f"Unknown stage '{name}'. Choose from {list(STAGES)}.")
+        stage = STAGES[name]
+        key = self.key(name)
+        start = time.perf_counter()
+        hit, value = self.cache.get(key)
+        if not hit:
+            inputs = [self.run(upstream) for upstream in stage.inputs]
+            start = time.perf_counter()
+            value = stage.run(self, *inputs)
+            self.cache.put(key, value)
+        self.log[name] = ("cached" if hit else "computed", time.perf_counter() - start)
+        self.results[name] = value
+        return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the memoized analysis pipeline.")
+    parser.add_argument("file", nargs="?", default=os.path.join(os.path.dirname(__file__), "data", "100.csv"))
+    parser.add_argument(
+        "--absolute", dest="relative", action="store_false", help="do not divide CBO, WMC and RFC by NOC"
+    )
+    parser.add_argument("--train-ratio", type=float, default=0.6)
+    parser.add_argument("--stratify", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--robust", action="store_true")
+    parser.add_argument("--clear", action="store_true", help="empty the stage cache first")
+    args = parser.parse_args()
+
+    cache = StageCache()
+    if args.clear:
+        cache.clear()
+    pipeline = Pipeline(
+        args.file,
+        relative=args.relative,
+        train_ratio=args.train_ratio,
+        stratify=args.stratify,
+        seed=args.seed,
+        robust=args.robust,
+        cache=cache,
+    )
+    mardia = pipeline.run("mardia")
+    pipeline.run("intervals")
+    fitted = pipeline.run("fit")
+
+    for name in STAGES:
+        # stages whose downstream results were cached are never visited
+        status, seconds = pipeline.log.get(name, ("unused", 0.0))
+        print(f"{name:<12}{status:<10}{seconds:>10.4f}s  {pipeline.key(name)[:12]}")
+    print(f"\nNormality: {mardia['normality']}")
+    print(f"Projects after outlier removal: {len(pipeline.run('outliers'))}")
+    for name, value in fitted.metrics.items():
+        print(f"{name}: {value:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from typing import Dict, Iterable, List, Mapping, Optional, TextIO, Tuple
+from ols import OLSSolver
+from quantiles import critical_value
+from transforms import LOG10, Transform, transform_from_dict, transform_to_dict
+
+model_dir = os.path.join(os.path.dirname(__file__), "data", "model")
+MODEL_FILE = "model.json"
+ARRAYS = ("coefficients", "means", "S_Z_inv")
+# bump when the artifact layout changes
+ARTIFACT_VERSION = 3
+
+PREDICTION_FIELDS = (
+    "point",
+    "prediction_lower",
+    "prediction_upper",
+    "confidence_lower",
+    "confidence_upper",
+)
+
+
+@dataclass(frozen=True)
+class Prediction:
+    """Point predictions and intervals on the original (untransformed) scale."""
+
+    point: np.ndarray
+    prediction_lower: np.ndarray
+    prediction_upper: np.ndarray
+    confidence_lower: np.ndarray
+    confidence_upper: np.ndarray
+
+    def as_array(self) -> np.ndarray:
+        """Return an (n, 5) array with the columns of PREDICTION_FIELDS."""
+        return np.column_stack([getattr(self, name) for name in PREDICTION_FIELDS])
+
+
+@dataclass(frozen=True)
+class FittedModel:
+    """
+    A fitted regression with every interval component precomputed.
+
+    The means, the inverse centered covariance S_Z_inv, the residual standard
+    deviation szy and the t critical value are computed once in `fit`, so
+    scoring new projects is a few vectorized operations per row. `relative`
+    records that the model was fitted on CBO, WMC and RFC divided by NOC.
+    """
+
+    coefficients: np.ndarray
+    means: np.ndarray
+    S_Z_inv: np.ndarray
+    szy: float
+    t_value: float
+    n: int
+    alpha: float
+    transform: Transform = LOG10
+    predictor_transforms: Tuple[Transform, ...] = field(default=())
+    relative: bool = False
+    metrics: Mapping[str, float] = field(default_factory=dict)
+
+    @property
+    def nu(self) -> int:
+        """Residual degrees of freedom, N - (p + 1)."""
+        return self.n - (len(self.means) + 1)
+
+    @classmethod
+    def fit(
+        cls,
+        Z: np.ndarray,
+        zy: np.ndarray,
+        alpha: float = 0.05,
+        transform: Transform = LOG10,
+        predictor_transforms: Tuple[Transform, ...] = (),
+        metrics: Optional[Mapping[str, float]] = None,
+        relative: bool = False,
+    ) -> "FittedModel":
+        """
+        Fit zy on Z (both already transformed) and precompute the interval terms.
+
+        `metrics` (e.g. R^2, MMRE and PRED) are stored with the model. Pass
+        `relative` if the metrics behind Z and zy were divided by NOC.
+        """
+        if Z.ndim != 2:
+            raise ValueError("Z must be a 2D array of shape (n_samples, n_features)")
+        if not (0 < alpha < 1):
+            raise ValueError("Alpha must be between 0 and 1")
+        N, p = Z.shape
+        nu = N - (p + 1)
+
+        solver = OLSSolver(Z)
+        coefficients = solver.solve(zy)
+        szy = np.sqrt(np.sum(solver.residuals(zy) ** 2) / nu)
+
+        means = np.mean(Z, axis=0)
+        Z_centered = Z - means
+        try:
+            S_Z_inv = np.linalg.inv(Z_centered.T @ Z_centered)
+        except np.linalg.LinAlgError:
+            raise ValueError("Covariance matrix is singular. Check for multicollinearity in predictors.")
+
+        return cls(
+            coefficients=coefficients,
+            means=means,
+            S_Z_inv=S_Z_inv,
+            szy=float(szy),
+            t_value=critical_value("t", 1 - alpha / 2, nu),
+            n=N,
+            alpha=alpha,
+            transform=transform,
+            predictor_transforms=tuple(predictor_transforms) or (LOG10,) * p,
+            relative=relative,
+            metrics={name: float(value) for name, value in (metrics or {}).items()},
+        )
+
+    def predict_transformed(self, Z_new: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the transformed-scale prediction and 1/N + quadratic form per row."""
+        Z_new = np.atleast_2d(np.asarray(Z_new, dtype=float))
+        zy_hat = self.coefficients[0] + Z_new @ self.coefficients[1:]
+        Z_centered = Z_new - self.means
+        quadratic_form = np.einsum("ij,jk,ik->i", Z_centered, self.S_Z_inv, Z_centered)
+        return zy_hat, 1 / self.n + quadratic_form
+
+    def predict(self, Z_new: np.ndarray) -> Prediction:
+        """
+        Score new projects given their transformed predictors.
+
+        Matches model.calculate_intervals for the training rows.
+        """
+        zy_hat, leverage = self.predict_transformed(Z_new)
+        prediction_margin = self.t_value * self.szy * np.sqrt(1 + leverage)
+        confidence_margin = self.t_value * self.szy * np.sqrt(leverage)
+        inverse = self.transform.inverse
+        return Prediction(
+            point=inverse(zy_hat),
+            prediction_lower=inverse(zy_hat - prediction_margin),
+            prediction_upper=inverse(zy_hat + prediction_margin),
+            confidence_lower=inverse(zy_hat - confidence_margin),
+            confidence_upper=inverse(zy_hat + confidence_margin),
+        )
+
+    def predict_metrics(self, X_new: np.ndarray) -> Prediction:
+        """
+        Score new projects given their raw (untransformed) metrics.
+
+        Each row holds one value per predictor, followed by NOC for a
+        `relative` model. The predictors are then divided by NOC and the
+        predictions multiplied by it, so they are on the raw RFC scale.
+        """
+        X_new = np.atleast_2d(np.asarray(X_new, dtype=float))
+        width = len(self.predictor_transforms) + self.relative
+        if X_new.ndim != 2 or X_new.shape[1] != width:
+            expected = f"{len(self.predictor_transforms)} predictors" + (" and NOC" if self.relative else "")
+            raise ValueError(f"Expected rows of {width} values ({expected}), got shape {X_new.shape}")
+        if self.relative:
+            noc = X_new[:, -1]
+            X_new = X_new[:, :-1] / noc[:, np.newaxis]
+        Z_new = np.column_stack(
+            [t.forward(X_new[:, i]) for i, t in enumerate(self.predictor_transforms)]
+        )
+        prediction = self.predict(Z_new)
+        if not self.relative:
+            return prediction
+        return Prediction(**{name: getattr(prediction, name) * noc for name in PREDICTION_FIELDS})
+
+
+def array_digest(path: str) -> str:
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def metadata_digest(metadata: Mapping) -> str:
+    """Return the SHA-256 of the canonical JSON of model.json without its own digest."""
+    body = {key: value for key, value in metadata.items() if key != "sha256"}
+    return hashlib.sha256(
+        json.dumps(body, sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
+
+
+def save_model(model: FittedModel, directory: str = model_dir) -> None:
+    """
+    Write a model artifact: model.json with the scalars, transforms, metrics,
+    the SHA-256 of every array and of its own body, next to one .npy file per
+    array.
+
+    The artifact is written to a staging directory that replaces `directory`
+    by renames, so readers never see a partial artifact. A previous artifact
+    is renamed aside first; a load racing the two renames can briefly find no
+    artifact at all.
+    """
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent)
+    try:
+        arrays = {}
+        for name in ARRAYS:
+            path = os.path.join(staging, f"{name}.npy")
+            np.save(path, getattr(model, name))
+            arrays[name] = {"file": f"{name}.npy", "sha256": array_digest(path)}
+        metadata = {
+            "version": ARTIFACT_VERSION,
+            "n": model.n,
+            "degrees_of_freedom": model.nu,
+            "alpha": model.alpha,
+            "szy": model.szy,
+            "t_value": model.t_value,
+            "transform": transform_to_dict(model.transform),
+            "predictor_transforms": [transform_to_dict(t) for t in model.predictor_transforms],
+            "relative": model.relative,
+            "metrics": dict(model.metrics),
+            "arrays": arrays,
+        }
+        metadata["sha256"] = metadata_digest(metadata)
+        with open(os.path.join(staging, MODEL_FILE), "w") as file:
+            json.dump(metadata, file, indent=2)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    previous = None
+    if os.path.isdir(directory):
+        previous = tempfile.mkdtemp(dir=parent)
+        os.replace(directory, previous)
+    os.replace(staging, directory)
+    if previous is not None:
+        shutil.rmtree(previous, ignore_errors=True)
+
+
+def load_model(directory: str = model_dir) -> FittedModel:
+    """Load a model artifact written by `save_model`, verifying its version and checksums."""
+    with open(os.path.join(directory, MODEL_FILE)) as file:
+        metadata = json.load(file)
+    if metadata.get("version") != ARTIFACT_VERSION:
+        raise ValueError(
+            f"Model artifact version {metadata.get('version')} is not supported "
+            f"(expected {ARTIFACT_VERSION})"
+        )
+    if metadata.get("sha256") != metadata_digest(metadata):
+        raise ValueError(f"Checksum mismatch for {MODEL_FILE}. The artifact is corrupted.")
+
+    arrays = {}
+    for name in ARRAYS:
+        entry = metadata["arrays"][name]
+        path = os.path.join(directory, entry["file"])
+        if array_digest(path) != entry["sha256"]:
+            raise ValueError(f"Checksum mismatch for {path}. The artifact is corrupted.")
+        arrays[name] = np.load(path)
+
+    model = FittedModel(
+        **arrays,
+        szy=metadata["szy"],
+        t_value=metadata["t_value"],
+        n=metadata["n"],
+        alpha=metadata["alpha"],
+        transform=transform_from_dict(metadata["transform"]),
+        predictor_transforms=tuple(
+            transform_from_dict(spec) for spec in metadata["predictor_transforms"]
+        ),
+        relative=metadata["relative"],
+        metrics=metadata["metrics"],
+    )
+    if model.nu != metadata["degrees_of_freedom"]:
+        raise ValueError("Degrees of freedom do not match the stored arrays")
+    return model
+
+
+def read_batches(lines: Iterable[str], batch_size: int) -> Iterable[np.ndarray]:
+    """
+    Group comma separated numeric lines into arrays.
+
+    Blank lines are skipped, and so is the first non-blank line if it is not
+    numeric (a header). Any other non-numeric line, or one with a different
+    number of columns, raises ValueError with its line number, so every
+    output row matches an input row.
+    """
+    batch: List[List[float]] = []
+    columns = None
+    header_allowed = True
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = [float(value) for value in line.split(",")]
+        except ValueError:
+            if header_allowed:
+                header_allowed = False
+                continue
+            raise ValueError(f"Line {number} is not numeric: {line!r}")
+        header_allowed = False
+        if columns is None:
+            columns = len(row)
+        elif len(row) != columns:
+            raise ValueError(f"Line {number} has {len(row)} columns, expected {columns}")
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield np.array(batch)
+            batch = []
+    if batch:
+        yield np.array(batch)
+
+
+def serve_stdin(
+    model: FittedModel,
+    input: TextIO = sys.stdin,
+    output: TextIO = sys.stdout,
+    batch_size: int = 10000,
+) -> None:
+    """
+    Score raw predictor rows (followed by NOC for a relative model) read as
+    CSV from `input` and write one CSV row of PREDICTION_FIELDS per input row
+    to `output`.
+    """
+    output.write(",".join(PREDICTION_FIELDS) + "\n")
+    for batch in read_batches(input, batch_size):
+        np.savetxt(output, model.predict_metrics(batch).as_array(), delimiter=",", fmt="%.6f")
+        output.flush()
+
+
+def make_handler(model: FittedModel):
+    class PredictionHandler(BaseHTTPRequestHandler):
+        """POST /predict with {"rows": [[x1, x2, ..., (NOC)], ...]} of raw metrics."""
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self.send_error(404)
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                prediction = model.predict_metrics(np.asarray(body["rows"], dtype=float))
+            except (KeyError, TypeError, ValueError) as e:
+                self.send_error(400, str(e))
+                return
+            payload: Dict[str, list] = {
+                name: getattr(prediction, name).tolist() for name in PREDICTION_FIELDS
+            }
+            data = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return PredictionHandler
+
+
+def serve_http(model: FittedModel, host: str = "127.0.0.1", port: int = 8000) -> None:
+    server = ThreadingHTTPServer((host, port), make_handler(model))
+    print(f"Serving predictions on http://{host}:{port}/predict", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch prediction endpoint for the RFC model.")
+    parser.add_argument("--model", default=model_dir, help="model artifact directory")
+    parser.add_argument("--train", default="train_data.csv", help="fit from this file when there is no artifact")
+    parser.add_argument("--http", type=int, metavar="PORT", help="serve HTTP instead of stdin/stdout")
+    args = parser.parse_args()
+
+    if os.path.exists(os.path.join(args.model, MODEL_FILE)):
+        model = load_model(args.model)
+    else:
+        from model import alpha, retrieve_data
+
+        projects = retrieve_data(args.train, normalized=True)
+        # train_data.csv holds metrics divided by NOC (see outliers.py)
+        model = FittedModel.fit(
+            np.column_stack((projects.zx1, projects.zx2)), projects.zy, alpha=alpha, relative=True
+        )
+        save_model(model, args.model)
+    if args.http:
+        serve_http(model, port=args.http)
+    else:
+        serve_stdin(model)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+from functools import lru_cache
+import numpy as np
+from typing import Dict, Set, Tuple
+
+# Critical values are cached per (distribution, probability, degrees of freedom).
+# The first lookup for a distribution and degrees of freedom fills that row of
+# the table with every common probability in one vectorized ppf call; other
+# probabilities are computed by scipy once and kept in an LRU cache.
+DISTRIBUTIONS = ("t", "f", "chi2", "norm")
+COMMON_PROBABILITIES = (0.9, 0.95, 0.975, 0.99, 0.995, 0.9975, 0.999, 0.9995)
+cache_size = 4096
+
+_table: Dict[Tuple[str, float, Tuple[float, ...]], float] = {}
+_rows: Set[Tuple[str, Tuple[float, ...]]] = set()
+_table_hits = 0
+
+
+def _key(dist: str, q: float, dof: Tuple[float, ...]) -> Tuple[str, float, Tuple[float, ...]]:
+    if dist not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution '{dist}'. Choose from {DISTRIBUTIONS}.")
+    # 1 - alpha / 2 and similar expressions should hit the same entry
+    return dist, round(float(q), 12), tuple(float(d) for d in dof)
+
+
+def build_row(dist: str, dof: Tuple[float, ...]) -> None:
+    """Fill the table with the common critical values of one distribution."""
+    from scipy import stats
+
+    probabilities = np.array(COMMON_PROBABILITIES)
+    if dist == "norm":
+        # both tails, for lower and upper interval bounds
+        probabilities = np.concatenate((probabilities, 1 - probabilities))
+    values = getattr(stats, dist).ppf(probabilities, *dof)
+    for probability, value in zip(probabilities, values):
+        _table[_key(dist, probability, dof)] = float(value)
+    _rows.add((dist, dof))
+
+
+@lru_cache(maxsize=cache_size)
+def _ppf(dist: str, q: float, dof: Tuple[float, ...]) -> float:
+    from scipy import stats
+
+    return float(getattr(stats, dist).ppf(q, *dof))
+
+
+def critical_value(dist: str, q: float, *dof: float) -> float:
+    """
+    Return the q quantile of a standard t, F, chi-square or normal distribution.
+
+    `dof` are the distribution's degrees of freedom, e.g.
+    critical_value("f", 0.995, 3, n - 3). For a normal with mean loc and
+    standard deviation scale use loc + scale * critical_value("norm", q).
+    """
+    global _table_hits
+    key = _key(dist, q, dof)
+    if (dist, key[2]) not in _rows:
+        build_row(dist, key[2])
+    value = _table.get(key)
+    if value is not None:
+        _table_hits += 1
+        return value
+    return _ppf(*key)
+
+
+def cache_info() -> Dict[str, int]:
+    """Return hit/miss counters of the table and the LRU cache."""
+    info = _ppf.cache_info()
+    return {
+        "table_hits": _table_hits,
+        "table_size": len(_table),
+        "table_rows": len(_rows),
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+    }
+
+
+def clear_cache() -> None:
+    global _table_hits
+    _table.clear()
+    _rows.clear()
+    _table_hits = 0
+    _ppf.cache_clear()
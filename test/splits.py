@@ -0,0 +1,73 @@
+import numpy as np
+from typing import Optional, Tuple
+
+
+def extreme_indices(*columns: np.ndarray) -> np.ndarray:
+    """Return the sorted unique positions of the minimum and maximum of each column."""
+    return np.unique(
+        [np.argmin(column) for column in columns] + [np.argmax(column) for column in columns]
+    )
+
+
+def quantile_strata(values: np.ndarray, n_strata: int) -> np.ndarray:
+    """Label each value with its quantile bin, 0 .. n_strata - 1."""
+    if n_strata < 1:
+        raise ValueError("n_strata must be at least 1")
+    edges = np.quantile(values, np.linspace(0, 1, n_strata + 1)[1:-1])
+    return np.searchsorted(edges, values, side="right")
+
+
+def allocate(counts: np.ndarray, total: int) -> np.ndarray:
+    """Split `total` over the strata in proportion to `counts` (largest remainder)."""
+    if total == 0:
+        return np.zeros(len(counts), dtype=int)
+    exact = counts * total / counts.sum()
+    quota = np.floor(exact).astype(int)
+    remainder = total - quota.sum()
+    quota[np.argsort(quota - exact, kind="stable")[:remainder]] += 1
+    return quota
+
+
+def split_indices(
+    n: int,
+    train_ratio: float = 0.6,
+    n_splits: int = 1,
+    rng: Optional[np.random.Generator] = None,
+    always_train: Optional[np.ndarray] = None,
+    strata: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Draw `n_splits` random train/test splits of range(n) at once.
+
+    Rows in `always_train` start every training set; the remaining rows fill
+    it up to int(n * train_ratio). If `strata` labels every row, each stratum
+    contributes to the training set in proportion to its size.
+    Returns (train, test) index arrays of shape (n_splits, n_train) and
+    (n_splits, n_test).
+    """
+    if not 0 < train_ratio < 1:
+        raise ValueError("train_ratio must be between 0 and 1")
+    rng = np.random.default_rng(rng)
+    fixed = np.unique(always_train) if always_train is not None else np.empty(0, dtype=np.intp)
+
+    remaining = np.ones(n, dtype=bool)
+    remaining[fixed] = False
+    remaining = np.flatnonzero(remaining)
+    n_train = min(max(int(n * train_ratio) - len(fixed), 0), len(remaining))
+
+    labels = np.zeros(len(remaining), dtype=np.intp)
+    if strata is not None:
+        _, labels = np.unique(np.asarray(strata)[remaining], return_inverse=True)
+    counts = np.bincount(labels)
+    quota = allocate(counts, n_train)
+
+    # Sorting label + uniform key groups each split's rows by stratum in a
+    # random order, so the first quota[s] rows of stratum s go to training.
+    keys = labels + rng.random((n_splits, len(remaining)))
+    order = remaining[np.argsort(keys, axis=1)]
+    sorted_labels = np.sort(labels)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    in_train = np.arange(len(remaining)) - starts[sorted_labels] < quota[sorted_labels]
+
+    train = np.hstack((np.tile(fixed, (n_splits, 1)), order[:, in_train]))
+    return train, order[:, ~in_train]
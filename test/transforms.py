@@ -0,0 +1,190 @@
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+import numpy as np
+from typing import Any, Dict, Mapping, Union
+
+# How values outside a transform's domain (e.g. non-positive values for a
+# logarithm) are handled: "propagate" applies the function anyway (giving
+# -inf/nan), "zero" maps them to 0.0 and "nan" maps them to NaN.
+INVALID_POLICIES = ("propagate", "zero", "nan")
+
+
+@dataclass(frozen=True)
+class Transform(ABC):
+    """
+    Column-wise normalizing transform with an inverse for back-conversion.
+
+    Subclasses implement `_forward`, `_inverse` and, if their domain is
+    restricted, `valid`.
+    """
+
+    invalid: str = "propagate"
+
+    def __post_init__(self):
+        if self.invalid not in INVALID_POLICIES:
+            raise ValueError(f"invalid must be one of {INVALID_POLICIES}")
+
+    @property
+    def name(self) -> str:
+        return type(self).__name__
+
+    def valid(self, values: np.ndarray) -> np.ndarray:
+        """Return the mask of values inside the transform's domain."""
+        return np.isfinite(values)
+
+    def forward(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=float)
+        if self.invalid == "propagate":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return self._forward(values)
+        mask = self.valid(values)
+        fill = 0.0 if self.invalid == "zero" else np.nan
+        result = np.full(values.shape, fill)
+        result[mask] = self._forward(values[mask])
+        return result
+
+    def inverse(self, values: np.ndarray) -> np.ndarray:
+        return self._inverse(np.asarray(values, dtype=float))
+
+    @abstractmethod
+    def _forward(self, values: np.ndarray) -> np.ndarray:
+        ...
+
+    @abstractmethod
+    def _inverse(self, values: np.ndarray) -> np.ndarray:
+        ...
+
+
+@dataclass(frozen=True)
+class Log10Transform(Transform):
+    def valid(self, values: np.ndarray) -> np.ndarray:
+        return values > 0
+
+    def _forward(self, values: np.ndarray) -> np.ndarray:
+        return np.log10(values)
+
+    def _inverse(self, values: np.ndarray) -> np.ndarray:
+        return 10**values
+
+
+@dataclass(frozen=True)
+class LogTransform(Transform):
+    def valid(self, values: np.ndarray) -> np.ndarray:
+        return values > 0
+
+    def _forward(self, values: np.ndarray) -> np.ndarray:
+        return np.log(values)
+
+    def _inverse(self, values: np.ndarray) -> np.ndarray:
+        return np.exp(values)
+
+
+@dataclass(frozen=True)
+class BoxCoxTransform(Transform):
+    lmbda: float = 0.0
+
+    @classmethod
+    def fit(cls, values: np.ndarray, invalid: str = "zero") -> "BoxCoxTransform":
+        """Estimate lambda by maximum likelihood on the positive values."""
+        from scipy import stats
+
+        values = np.asarray(values, dtype=float)
+        return cls(invalid=invalid, lmbda=float(stats.boxcox_normmax(values[values > 0], method="mle")))
+
+    def valid(self, values: np.ndarray) -> np.ndarray:
+        return values > 0
+
+    def _forward(self, values: np.ndarray) -> np.ndarray:
+        from scipy import special
+
+        return special.boxcox(values, self.lmbda)
+
+    def _inverse(self, values: np.ndarray) -> np.ndarray:
+        from scipy import special
+
+        return special.inv_boxcox(values, self.lmbda)
+
+
+@dataclass(frozen=True)
+class JohnsonTransform(Transform):
+    """Johnson SU transform z = gamma + delta * asinh((x - xi) / lam)."""
+
+    gamma: float = 0.0
+    delta: float = 1.0
+    xi: float = 0.0
+    lam: float = 1.0
+
+    @classmethod
+    def fit(cls, values: np.ndarray, invalid: str = "zero") -> "JohnsonTransform":
+        """Fit the Johnson SU parameters by maximum likelihood on the finite values."""
+        from scipy import stats
+
+        values = np.asarray(values, dtype=float)
+        gamma, delta, xi, lam = stats.johnsonsu.fit(values[np.isfinite(values)])
+        return cls(invalid=invalid, gamma=gamma, delta=delta, xi=xi, lam=lam)
+
+    def _forward(self, values: np.ndarray) -> np.ndarray:
+        return self.gamma + self.delta * np.arcsinh((values - self.xi) / self.lam)
+
+    def _inverse(self, values: np.ndarray) -> np.ndarray:
+        return self.xi + self.lam * np.sinh((values - self.gamma) / self.delta)
+
+
+LOG10 = Log10Transform()
+
+TRANSFORMS = {
+    "log10": Log10Transform,
+    "ln": LogTransform,
+    "boxcox": BoxCoxTransform,
+    "johnson": JohnsonTransform,
+}
+
+ColumnTransforms = Union[Transform, Mapping[str, Transform]]
+
+
+def fit_transforms(
+    columns: Mapping[str, np.ndarray], kind: str = "log10", invalid: str = "zero"
+) -> Dict[str, Transform]:
+    """
+    Return a transform of the given kind for each named column, fitting the
+    parameters of Box-Cox and Johnson transforms to that column.
+    """
+    try:
+        cls = TRANSFORMS[kind]
+    except KeyError:
+        raise ValueError(f"Unknown transform '{kind}'. Choose from {list(TRANSFORMS)}.")
+    if hasattr(cls, "fit"):
+        return {name: cls.fit(values, invalid) for name, values in columns.items()}
+    return {name: cls(invalid=invalid) for name in columns}
+
+
+def column_transform(transform: ColumnTransforms, column: str) -> Transform:
+    """Pick the transform of a column from a single transform or a mapping."""
+    if isinstance(transform, Transform):
+        return transform
+    return transform[column]
+
+
+def transform_to_dict(transform: Transform) -> Dict[str, Any]:
+    """Describe a transform as plain JSON-compatible data."""
+    for kind, cls in TRANSFORMS.items():
+        if type(transform) is cls:
+            return {"kind": kind, **asdict(transform)}
+    raise ValueError(f"Cannot serialize transform {transform.name}")
+
+
+def transform_spec(transform: ColumnTransforms) -> Dict[str, Any]:
+    """Describe a single transform or a per-column mapping as JSON-compatible data."""
+    if isinstance(transform, Transform):
+        return transform_to_dict(transform)
+    return {column: transform_to_dict(t) for column, t in sorted(transform.items())}
+
+
+def transform_from_dict(spec: Mapping[str, Any]) -> Transform:
+    """Rebuild a transform described by `transform_to_dict`."""
+    spec = dict(spec)
+    try:
+        cls = TRANSFORMS[spec.pop("kind")]
+    except KeyError:
+        raise ValueError(f"Unknown transform in {spec}. Choose from {list(TRANSFORMS)}.")
+    return cls(**spec)